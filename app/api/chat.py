@@ -5,6 +5,7 @@ import json
 import asyncio
 from datetime import datetime
 import logging
+import time
 
 from app.database import get_db
 from app.services.advanced_chat_service import AdvancedChatService
@@ -155,7 +156,9 @@ async def get_chat_history(
         
         return {
             'history': history,
-            'context_history': context_history,
+            'context_history': [
+                {**msg, 'timestamp': _fmt_ts(msg['timestamp'])} for msg in context_history
+            ],
             'total_count': len(history)
         }
         
@@ -222,7 +225,7 @@ async def get_chat_context(user_id: int):
             "conversation_flow": context.conversation_flow,
             "sentiment_score": context.sentiment_score,
             "user_satisfaction": context.user_satisfaction,
-            "last_interaction": context.last_interaction.isoformat()
+            "last_interaction": _fmt_ts(context.last_interaction)
         }
     except Exception as e:
         logger.error(f"Error getting chat context: {e}")
@@ -241,7 +244,7 @@ async def get_user_sentiment(user_id: int):
                 {
                     "message": msg["message"],
                     "sentiment": msg.get("sentiment", "neutral"),
-                    "timestamp": msg["timestamp"]
+                    "timestamp": _fmt_ts(msg["timestamp"])
                 }
                 for msg in recent_messages
             ],
@@ -273,7 +276,7 @@ async def submit_user_feedback(
             'intent': 'feedback',
             'entities': {},
             'sentiment': 'positive' if satisfaction > 0.5 else 'negative',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time_ns(),
             'feedback_score': satisfaction
         })
         
@@ -455,6 +458,10 @@ async def get_chat_analytics(user_id: int):
         logger.error(f"Error getting chat analytics: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت تحلیل‌ها: {str(e)}")
 
+def _fmt_ts(timestamp_ns: int) -> str:
+    """Format an in-memory ``time.time_ns()`` timestamp as ISO 8601"""
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
 def _get_preferred_intents(history: List[Dict]) -> Dict[str, int]:
     """Get user's preferred conversation intents"""
     intent_counts = {}
@@ -469,7 +476,7 @@ def _get_sentiment_trend(history: List[Dict]) -> List[Dict]:
     for msg in history[-10:]:  # Last 10 messages
         sentiment_trend.append({
             "sentiment": msg.get('sentiment', 'neutral'),
-            "timestamp": msg['timestamp']
+            "timestamp": _fmt_ts(msg['timestamp'])
         })
     return sentiment_trend
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
@@ -14,7 +14,10 @@ from app.models import User, Route as RouteModel
 
 router = APIRouter()
 recommender = RouteRecommender()
-map_service = MapService()
+
+def get_map_service(request: Request) -> MapService:
+    """سرویس نقشه مشترک که هنگام راه‌اندازی روی app.state ساخته شده است"""
+    return request.app.state.map_service
 
 @router.post("/recommend", response_model=RecommendationResponse)
 async def recommend_routes(request: RecommendationRequest):
@@ -168,7 +171,8 @@ async def get_route_map(
     origin: str = Query(..., description="Origin"),
     destination: str = Query(..., description="Destination"),
     include_attractions: bool = Query(True, description="Include attractions"),
-    lang: str = Query("fa", description="Language")
+    lang: str = Query("fa", description="Language"),
+    map_service: MapService = Depends(get_map_service)
 ):
     try:
         # Get city coordinates
@@ -230,19 +234,20 @@ async def get_nearby_places(
     lat: float = Query(..., description="Latitude"),
     lng: float = Query(..., description="Longitude"),
     radius: float = Query(5000, description="Search radius (meters)"),
-    place_type: Optional[str] = Query(None, description="Place type")
+    place_type: Optional[str] = Query(None, description="Place type"),
+    map_service: MapService = Depends(get_map_service)
 ):
     try:
-        places = map_service.find_nearby_places(lat, lng, radius, place_type)
+        places = await map_service.find_nearby_places_async(lat, lng, radius, place_type)
         return {"places": places}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding nearby places: {str(e)}")
 
 @router.get("/city-info/{city_name}")
-async def get_city_info(city_name: str):
+async def get_city_info(city_name: str, map_service: MapService = Depends(get_map_service)):
     try:
-        city_info = map_service.get_city_info(city_name)
+        city_info = await map_service.get_city_info_async(city_name)
         
         if not city_info:
             raise HTTPException(status_code=404, detail="City info not found")
@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     project_name: str = "AI Travel Recommender Agent"
     
     openstreetmap_url: str = "https://nominatim.openstreetmap.org"
+    overpass_url: str = "https://overpass-api.de/api/interpreter"
     geocoding_api_key: Optional[str] = None
     
     spacy_model: str = "en_core_web_sm"
@@ -1,21 +1,62 @@
 import re
 import json
+import functools
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, timedelta
 from dataclasses import dataclass
 import logging
+import time
+import threading
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Number of independently locked shards holding chat contexts (power of two)
+CONTEXT_SHARDS = 32
+
+# Inline bilingual strings, keyed by language then by a short opcode.
+# Templates are ``str.format`` ready so call sites never build both variants.
+LANG_STRINGS = {
+    'fa': {
+        'ask_budget': "بودجه مورد نظر شما چقدر است؟",
+        'ask_days': "چند روز می‌خواهید سفر کنید؟",
+        'origin_selected': "شما {a} را انتخاب کرده‌اید. لطفاً مقصد را نیز مشخص کنید.",
+        'ask_origin_destination': "لطفاً مبدا و مقصد سفر خود را مشخص کنید.",
+        'default_currency': "تومان",
+        'ask_budget_amount': "لطفاً بودجه مورد نظر خود را مشخص کنید.",
+        'default_time_unit': "روز",
+        'ask_duration': "لطفاً مدت سفر مورد نظر خود را مشخص کنید.",
+        'error': "متأسفانه خطایی رخ داد. لطفاً دوباره تلاش کنید.",
+        'search_route': "جستجوی مسیر",
+        'view_map': "مشاهده نقشه",
+        'cost_calculator': "محاسبه‌گر هزینه",
+        'attractions_list': "لیست جاذبه‌ها",
+    },
+    'en': {
+        'ask_budget': "What is your budget?",
+        'ask_days': "How many days do you want to travel?",
+        'origin_selected': "You selected {a}. Please specify the destination.",
+        'ask_origin_destination': "Please specify your trip origin and destination.",
+        'default_currency': "Toman",
+        'ask_budget_amount': "Please specify your desired budget.",
+        'default_time_unit': "days",
+        'ask_duration': "Please specify your desired trip duration.",
+        'error': "Sorry, an error occurred. Please try again.",
+        'search_route': "Search Route",
+        'view_map': "View Map",
+        'cost_calculator': "Cost Calculator",
+        'attractions_list': "Attractions List",
+    }
+}
+
+@dataclass(slots=True)
 class ChatContext:
     user_id: str
     current_language: str = 'fa'
     conversation_history: List[Dict] = None
     user_preferences: Dict[str, Any] = None
     current_route: Dict[str, Any] = None
-    last_interaction: datetime = None
+    last_interaction: int = None  # time.time_ns()
     conversation_flow: str = 'initial'
     sentiment_score: float = 0.0
     user_satisfaction: float = 0.0
@@ -26,9 +67,9 @@ class ChatContext:
         if self.user_preferences is None:
             self.user_preferences = {}
         if self.last_interaction is None:
-            self.last_interaction = datetime.now()
+            self.last_interaction = time.time_ns()
 
-@dataclass
+@dataclass(slots=True)
 class ChatResponse:
     message: str
     intent: str
@@ -42,16 +83,115 @@ class ChatResponse:
     conversation_flow: Optional[str] = None
     follow_up_questions: Optional[List[str]] = None
 
+# Contextual suggestion templates per language and intent branch;
+# ``{a}``/``{b}`` are the first and second extracted cities
+_SUGG_TEMPLATES = {
+    'fa': {
+        'route_2city': (
+            "بودجه برای {a} به {b}",
+            "زمان سفر {a} به {b}",
+            "جاذبه‌های {b}",
+            "مسیر ارزان {a} به {b}"
+        ),
+        'route_1city': (
+            "مقصد برای {a}",
+            "بودجه سفر به {a}",
+            "زمان سفر به {a}",
+            "جاذبه‌های {a}"
+        ),
+        'budget_request': ("مسیر ارزان", "سفر اقتصادی", "هزینه هتل", "هزینه غذا"),
+        'time_request': ("سفر کوتاه", "سفر طولانی", "مسیر سریع", "توقف در مسیر")
+    },
+    'en': {
+        'route_2city': (
+            "Budget for {a} to {b}",
+            "Travel time {a} to {b}",
+            "Attractions in {b}",
+            "Cheap route {a} to {b}"
+        ),
+        'route_1city': (
+            "Destination for {a}",
+            "Budget for trip to {a}",
+            "Travel time to {a}",
+            "Attractions in {a}"
+        ),
+        'budget_request': ("Cheap route", "Economic trip", "Hotel cost", "Food cost"),
+        'time_request': ("Short trip", "Long trip", "Fast route", "Stop on route")
+    }
+}
+
+# Conversation flow templates; steps and questions are tuples so cached
+# lookups can be shared between callers without copying
+CONVERSATION_FLOWS = {
+    'route_planning': {
+        'fa': {
+            'next_steps': ('بودجه', 'زمان سفر', 'ترجیحات', 'جاذبه‌ها'),
+            'questions': (
+                'بودجه مورد نظر شما چقدر است؟',
+                'چند روز می‌خواهید سفر کنید؟',
+                'آیا ترجیح خاصی دارید؟ (سریع، ارزان، زیبا)',
+                'آیا جاذبه خاصی مد نظرتان است؟'
+            )
+        },
+        'en': {
+            'next_steps': ('Budget', 'Travel time', 'Preferences', 'Attractions'),
+            'questions': (
+                'What is your budget?',
+                'How many days do you want to travel?',
+                'Do you have any preferences? (fast, cheap, beautiful)',
+                'Are there specific attractions you want to see?'
+            )
+        }
+    },
+    'budget_discussion': {
+        'fa': {
+            'next_steps': ('مسیر ارزان', 'هزینه تفصیلی', 'پیشنهادات'),
+            'questions': (
+                'آیا مسیر ارزان‌تر می‌خواهید؟',
+                'آیا هزینه تفصیلی نیاز دارید؟',
+                'آیا پیشنهادات بیشتری می‌خواهید؟'
+            )
+        },
+        'en': {
+            'next_steps': ('Cheap route', 'Detailed cost', 'Suggestions'),
+            'questions': (
+                'Do you want a cheaper route?',
+                'Do you need detailed cost breakdown?',
+                'Do you want more suggestions?'
+            )
+        }
+    }
+}
+
+@functools.lru_cache(maxsize=16)
+def _flow_entry(flow: str, language: str, key: str) -> Tuple[str, ...]:
+    """Get the ``next_steps`` or ``questions`` of a conversation flow"""
+    if flow in CONVERSATION_FLOWS:
+        return CONVERSATION_FLOWS[flow][language][key]
+    return ()
+
+# Route preference keywords, one named group per preference key
+_PREF_RE = re.compile(
+    r'(?P<fastest>سریع|fast)|(?P<cheapest>ارزان|cheap)|(?P<scenic>زیبا|beautiful)'
+    r'|(?P<quiet>آرام|quiet)|(?P<luxury>لوکس|luxury)',
+    re.IGNORECASE
+)
+
 class AdvancedChatService:
     def __init__(self):
-        self.chat_contexts = {}
+        # Chat contexts are sharded by user id so threaded workers only
+        # contend on the lock of the shard they touch
+        self._shards = [({}, threading.Lock()) for _ in range(CONTEXT_SHARDS)]
         self.language_patterns = self._load_language_patterns()
         self.intent_patterns = self._load_intent_patterns()
         self.entity_patterns = self._load_entity_patterns()
+        self.entity_pattern_scripts = self._classify_entity_patterns()
         self.response_templates = self._load_response_templates()
         self.suggestion_templates = self._load_suggestion_templates()
         self.conversation_flows = self._load_conversation_flows()
         self.sentiment_patterns = self._load_sentiment_patterns()
+        # Message processing is pure CPU work; keep it off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='chat')
         
     def _load_language_patterns(self) -> Dict[str, re.Pattern]:
         return {
@@ -117,7 +257,7 @@ class AdvancedChatService:
             'number': [
                 re.compile(r'\d+'),
                 re.compile(r'یک|دو|سه|چهار|پنج|شش|هفت|هشت|نه|ده'),
-                re.compile(r'one|two|three|four|five|six|seven|eight|nine|ten')
+                re.compile(r'one|two|three|four|five|six|seven|eight|nine|ten', re.IGNORECASE)
             ],
             'currency': [
                 re.compile(r'تومان|ریال|دلار|یورو', re.IGNORECASE),
@@ -133,6 +273,21 @@ class AdvancedChatService:
             ]
         }
     
+    def _classify_entity_patterns(self) -> Dict[str, List[Tuple[str, re.Pattern]]]:
+        """Tag each entity pattern with the script it needs to match"""
+        classified = {}
+        for entity_type, patterns in self.entity_patterns.items():
+            classified[entity_type] = []
+            for pattern in patterns:
+                if self.language_patterns['persian'].search(pattern.pattern):
+                    script = 'persian'
+                elif pattern.pattern.startswith(r'\d'):
+                    script = 'digit'
+                else:
+                    script = 'english'
+                classified[entity_type].append((script, pattern))
+        return classified
+    
     def _load_sentiment_patterns(self) -> Dict[str, List[re.Pattern]]:
         """Load sentiment analysis patterns"""
         return {
@@ -153,46 +308,7 @@ class AdvancedChatService:
     
     def _load_conversation_flows(self) -> Dict[str, Dict[str, Any]]:
         """Load conversation flow templates"""
-        return {
-            'route_planning': {
-                'fa': {
-                    'next_steps': ['بودجه', 'زمان سفر', 'ترجیحات', 'جاذبه‌ها'],
-                    'questions': [
-                        'بودجه مورد نظر شما چقدر است؟',
-                        'چند روز می‌خواهید سفر کنید؟',
-                        'آیا ترجیح خاصی دارید؟ (سریع، ارزان، زیبا)',
-                        'آیا جاذبه خاصی مد نظرتان است؟'
-                    ]
-                },
-                'en': {
-                    'next_steps': ['Budget', 'Travel time', 'Preferences', 'Attractions'],
-                    'questions': [
-                        'What is your budget?',
-                        'How many days do you want to travel?',
-                        'Do you have any preferences? (fast, cheap, beautiful)',
-                        'Are there specific attractions you want to see?'
-                    ]
-                }
-            },
-            'budget_discussion': {
-                'fa': {
-                    'next_steps': ['مسیر ارزان', 'هزینه تفصیلی', 'پیشنهادات'],
-                    'questions': [
-                        'آیا مسیر ارزان‌تر می‌خواهید؟',
-                        'آیا هزینه تفصیلی نیاز دارید؟',
-                        'آیا پیشنهادات بیشتری می‌خواهید؟'
-                    ]
-                },
-                'en': {
-                    'next_steps': ['Cheap route', 'Detailed cost', 'Suggestions'],
-                    'questions': [
-                        'Do you want a cheaper route?',
-                        'Do you need detailed cost breakdown?',
-                        'Do you want more suggestions?'
-                    ]
-                }
-            }
-        }
+        return CONVERSATION_FLOWS
     
     def _load_response_templates(self) -> Dict[str, Dict[str, str]]:
         """Load response templates for different languages"""
@@ -323,14 +439,21 @@ class AdvancedChatService:
         """Extract entities from text"""
         entities = {}
         
-        for entity_type, patterns in self.entity_patterns.items():
-            entities[entity_type] = []
-            for pattern in patterns:
-                matches = pattern.findall(text)
-                entities[entity_type].extend(matches)
+        # Cheap pre-checks so patterns for absent scripts are never run
+        present = {
+            'persian': self.language_patterns['persian'].search(text) is not None,
+            'english': self.language_patterns['english'].search(text) is not None,
+            'digit': any(c.isdigit() for c in text)
+        }
+        
+        for entity_type, patterns in self.entity_pattern_scripts.items():
+            matches = set()
+            for script, pattern in patterns:
+                if present[script]:
+                    matches.update(pattern.findall(text))
             
             # Remove duplicates and normalize
-            entities[entity_type] = list(set(entities[entity_type]))
+            entities[entity_type] = list(matches)
         
         return entities
     
@@ -340,62 +463,39 @@ class AdvancedChatService:
         
         # Get flow-based suggestions
         flow_suggestions = self._get_flow_suggestions(context.conversation_flow, language)
+        templates = _SUGG_TEMPLATES[language]
         
         if intent == 'route_request':
             cities = entities.get('city', [])
             if len(cities) >= 2:
-                return [
-                    f"بودجه برای {cities[0]} به {cities[1]}" if language == 'fa' else f"Budget for {cities[0]} to {cities[1]}",
-                    f"زمان سفر {cities[0]} به {cities[1]}" if language == 'fa' else f"Travel time {cities[0]} to {cities[1]}",
-                    f"جاذبه‌های {cities[1]}" if language == 'fa' else f"Attractions in {cities[1]}",
-                    f"مسیر ارزان {cities[0]} به {cities[1]}" if language == 'fa' else f"Cheap route {cities[0]} to {cities[1]}"
-                ]
+                a, b = cities[0], cities[1]
+                return [t.format(a=a, b=b) for t in templates['route_2city']]
             elif len(cities) == 1:
-                return [
-                    f"مقصد برای {cities[0]}" if language == 'fa' else f"Destination for {cities[0]}",
-                    f"بودجه سفر به {cities[0]}" if language == 'fa' else f"Budget for trip to {cities[0]}",
-                    f"زمان سفر به {cities[0]}" if language == 'fa' else f"Travel time to {cities[0]}",
-                    f"جاذبه‌های {cities[0]}" if language == 'fa' else f"Attractions in {cities[0]}"
-                ]
-        
-        elif intent == 'budget_request':
-            return [
-                "مسیر ارزان" if language == 'fa' else "Cheap route",
-                "سفر اقتصادی" if language == 'fa' else "Economic trip",
-                "هزینه هتل" if language == 'fa' else "Hotel cost",
-                "هزینه غذا" if language == 'fa' else "Food cost"
-            ]
+                a = cities[0]
+                return [t.format(a=a) for t in templates['route_1city']]
         
-        elif intent == 'time_request':
-            return [
-                "سفر کوتاه" if language == 'fa' else "Short trip",
-                "سفر طولانی" if language == 'fa' else "Long trip",
-                "مسیر سریع" if language == 'fa' else "Fast route",
-                "توقف در مسیر" if language == 'fa' else "Stop on route"
-            ]
+        elif intent == 'budget_request' or intent == 'time_request':
+            return list(templates[intent])
         
         # Return flow-based suggestions if available, otherwise base suggestions
         return flow_suggestions if flow_suggestions else base_suggestions[:4]
     
-    def _get_flow_suggestions(self, flow: str, language: str) -> List[str]:
+    def _get_flow_suggestions(self, flow: str, language: str) -> Tuple[str, ...]:
         """Get suggestions based on conversation flow"""
-        if flow in self.conversation_flows:
-            return self.conversation_flows[flow][language]['next_steps']
-        return []
+        return _flow_entry(flow, language, 'next_steps')
     
-    def _get_follow_up_questions(self, intent: str, context: ChatContext, language: str) -> List[str]:
+    def _get_follow_up_questions(self, intent: str, context: ChatContext, language: str) -> Tuple[str, ...]:
         """Get follow-up questions based on intent and context"""
-        if context.conversation_flow in self.conversation_flows:
-            return self.conversation_flows[context.conversation_flow][language]['questions']
+        questions = _flow_entry(context.conversation_flow, language, 'questions')
+        if questions:
+            return questions
         
         # Default follow-up questions
         if intent == 'route_request':
-            return [
-                "بودجه مورد نظر شما چقدر است؟" if language == 'fa' else "What is your budget?",
-                "چند روز می‌خواهید سفر کنید؟" if language == 'fa' else "How many days do you want to travel?"
-            ]
+            strings = LANG_STRINGS[language]
+            return (strings['ask_budget'], strings['ask_days'])
         
-        return []
+        return ()
     
     def _update_conversation_flow(self, intent: str, entities: Dict[str, List[str]], context: ChatContext) -> str:
         """Update conversation flow based on intent and entities"""
@@ -411,6 +511,7 @@ class AdvancedChatService:
     def generate_response(self, intent: str, entities: Dict[str, List[str]], language: str, context: ChatContext) -> str:
         """Generate response based on intent, entities, and context"""
         templates = self.response_templates[language]
+        strings = LANG_STRINGS[language]
         
         if intent == 'greeting':
             return templates['greeting']
@@ -442,29 +543,29 @@ class AdvancedChatService:
             if len(cities) >= 2:
                 return templates['route_confirm'].format(origin=cities[0], destination=cities[1])
             elif len(cities) == 1:
-                return f"شما {cities[0]} را انتخاب کرده‌اید. لطفاً مقصد را نیز مشخص کنید." if language == 'fa' else f"You selected {cities[0]}. Please specify the destination."
+                return strings['origin_selected'].format(a=cities[0])
             else:
-                return "لطفاً مبدا و مقصد سفر خود را مشخص کنید." if language == 'fa' else "Please specify your trip origin and destination."
+                return strings['ask_origin_destination']
         
         elif intent == 'budget_request':
             numbers = entities.get('number', [])
-            currencies = entities.get('currency', ['تومان' if language == 'fa' else 'Toman'])
+            currencies = entities.get('currency', [strings['default_currency']])
             if numbers:
                 amount = numbers[0]
                 currency = currencies[0]
                 return templates['budget_confirm'].format(amount=amount, currency=currency)
             else:
-                return "لطفاً بودجه مورد نظر خود را مشخص کنید." if language == 'fa' else "Please specify your desired budget."
+                return strings['ask_budget_amount']
         
         elif intent == 'time_request':
             numbers = entities.get('number', [])
             time_units = entities.get('time_unit', [])
             if numbers:
                 duration = numbers[0]
-                unit = time_units[0] if time_units else ('روز' if language == 'fa' else 'days')
+                unit = time_units[0] if time_units else strings['default_time_unit']
                 return templates['time_confirm'].format(duration=duration, unit=unit)
             else:
-                return "لطفاً مدت سفر مورد نظر خود را مشخص کنید." if language == 'fa' else "Please specify your desired trip duration."
+                return strings['ask_duration']
         
         elif intent == 'preference_request':
             return templates['preference_confirm']
@@ -506,38 +607,39 @@ class AdvancedChatService:
                 pass
         
         # Extract preferences
-        preferences = entities.get('preference', [])
-        text_lower = text.lower()
-        
-        if 'سریع' in text_lower or 'fast' in text_lower:
-            route_info['preferences']['fastest'] = 0.8
-        if 'ارزان' in text_lower or 'cheap' in text_lower:
-            route_info['preferences']['cheapest'] = 0.8
-        if 'زیبا' in text_lower or 'beautiful' in text_lower:
-            route_info['preferences']['scenic'] = 0.8
-        if 'آرام' in text_lower or 'quiet' in text_lower:
-            route_info['preferences']['quiet'] = 0.8
-        if 'لوکس' in text_lower or 'luxury' in text_lower:
-            route_info['preferences']['luxury'] = 0.8
+        for match in _PREF_RE.finditer(text):
+            route_info['preferences'][match.lastgroup] = 0.8
         
         return route_info
     
     def get_or_create_context(self, user_id: str, language: str = 'fa') -> ChatContext:
         """Get or create chat context for user"""
-        if user_id not in self.chat_contexts:
-            self.chat_contexts[user_id] = ChatContext(
-                user_id=user_id,
-                current_language=language
-            )
-        else:
-            # Update language if changed
-            self.chat_contexts[user_id].current_language = language
-            self.chat_contexts[user_id].last_interaction = datetime.now()
+        contexts, lock = self._shard(user_id)
+        with lock:
+            context = contexts.get(user_id)
+            if context is None:
+                context = contexts[user_id] = ChatContext(
+                    user_id=user_id,
+                    current_language=language
+                )
+            else:
+                # Update language if changed
+                context.current_language = language
+                context.last_interaction = time.time_ns()
         
-        return self.chat_contexts[user_id]
+        return context
+    
+    def _shard(self, user_id: str) -> Tuple[Dict[str, ChatContext], threading.Lock]:
+        """Get the context shard and its lock for a user"""
+        return self._shards[hash(user_id) & (CONTEXT_SHARDS - 1)]
     
     async def process_message(self, message: str, user_id: str, language: str = 'fa') -> ChatResponse:
         """Process chat message and return structured response"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._process_sync, message, user_id, language)
+    
+    def _process_sync(self, message: str, user_id: str, language: str = 'fa') -> ChatResponse:
+        """Synchronous body of ``process_message``"""
         try:
             # Get or create context
             context = self.get_or_create_context(user_id, language)
@@ -577,7 +679,7 @@ class AdvancedChatService:
                 'intent': intent,
                 'entities': entities,
                 'sentiment': sentiment,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': time.time_ns()
             })
             
             # Keep only last 10 messages
@@ -603,42 +705,48 @@ class AdvancedChatService:
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             return ChatResponse(
-                message="متأسفانه خطایی رخ داد. لطفاً دوباره تلاش کنید." if language == 'fa' else "Sorry, an error occurred. Please try again.",
+                message=LANG_STRINGS[language]['error'],
                 intent='error',
                 confidence=0.0,
                 entities={},
                 suggestions=self.suggestion_templates[language][:4]
             )
     
+    def process_batch(self, items: List[Tuple[str, str, str]]) -> List[ChatResponse]:
+        """Process many ``(message, user_id, language)`` items in a single call"""
+        process = self._process_sync
+        return [process(message, user_id, language) for message, user_id, language in items]
+    
     def _generate_quick_actions(self, intent: str, entities: Dict[str, List[str]], language: str) -> List[Dict[str, Any]]:
         """Generate quick action buttons based on intent"""
         actions = []
+        strings = LANG_STRINGS[language]
         
         if intent == 'route_request':
             cities = entities.get('city', [])
             if len(cities) >= 2:
                 actions.append({
                     'type': 'route_search',
-                    'text': 'جستجوی مسیر' if language == 'fa' else 'Search Route',
+                    'text': strings['search_route'],
                     'data': {'origin': cities[0], 'destination': cities[1]}
                 })
                 actions.append({
                     'type': 'view_map',
-                    'text': 'مشاهده نقشه' if language == 'fa' else 'View Map',
+                    'text': strings['view_map'],
                     'data': {'origin': cities[0], 'destination': cities[1]}
                 })
         
         if intent == 'budget_request':
             actions.append({
                 'type': 'budget_calculator',
-                'text': 'محاسبه‌گر هزینه' if language == 'fa' else 'Cost Calculator',
+                'text': strings['cost_calculator'],
                 'data': {}
             })
         
         if intent == 'attraction_request':
             actions.append({
                 'type': 'attractions_list',
-                'text': 'لیست جاذبه‌ها' if language == 'fa' else 'Attractions List',
+                'text': strings['attractions_list'],
                 'data': {}
             })
         
@@ -646,21 +754,30 @@ class AdvancedChatService:
     
     def get_chat_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get chat history for user"""
-        if user_id in self.chat_contexts:
-            return self.chat_contexts[user_id].conversation_history[-limit:]
+        contexts, lock = self._shard(user_id)
+        with lock:
+            context = contexts.get(user_id)
+            if context is not None:
+                return context.conversation_history[-limit:]
         return []
     
     def clear_chat_history(self, user_id: str) -> bool:
         """Clear chat history for user"""
-        if user_id in self.chat_contexts:
-            self.chat_contexts[user_id].conversation_history = []
-            self.chat_contexts[user_id].conversation_flow = 'initial'
-            return True
+        contexts, lock = self._shard(user_id)
+        with lock:
+            context = contexts.get(user_id)
+            if context is not None:
+                context.conversation_history = []
+                context.conversation_flow = 'initial'
+                return True
         return False
     
     def update_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> bool:
         """Update user preferences"""
-        if user_id in self.chat_contexts:
-            self.chat_contexts[user_id].user_preferences.update(preferences)
-            return True
+        contexts, lock = self._shard(user_id)
+        with lock:
+            context = contexts.get(user_id)
+            if context is not None:
+                context.user_preferences.update(preferences)
+                return True
         return False 
\ No newline at end of file
@@ -1,25 +1,132 @@
 import re
-import json
+import functools
+import string
+import sys
+import types
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, FrozenSet, Iterable, List, Any, Mapping, Optional, Tuple
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import date
 import spacy
 from spacy.language import Language
-from spacy.tokens import Doc, Span
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# str.translate deletion tables: the length drop counts a script's characters
+# without materialising the matches
+_PERSIAN_RANGES = ((0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+_PERSIAN_DELETE = dict.fromkeys(code for start, end in _PERSIAN_RANGES for code in range(start, end + 1))
+_ENGLISH_DELETE = dict.fromkeys(map(ord, string.ascii_letters))
+
+# Only tokenisation and NER are used; skip loading the other pipeline weights
+_UNUSED_SPACY_COMPONENTS = ["parser", "tagger", "attribute_ruler", "lemmatizer"]
+
+_UNESCO_TERMS = frozenset({'تخت جمشید', 'میدان امام', 'باغ ارم', 'Persepolis', 'Imam Square', 'Eram Garden'})
+_RELIGIOUS_TERMS = frozenset({'حرم', 'مسجد', 'زیارت', 'shrine', 'mosque', 'pilgrimage'})
+_HISTORICAL_TERMS = frozenset({'تاریخی', 'کاخ', 'موزه', 'historical', 'palace', 'museum'})
+
+_CITY_SIGNIFICANCE = types.MappingProxyType({
+    'اصفهان': 4.8,
+    'شیراز': 4.7,
+    'مشهد': 4.9,
+    'تهران': 4.2,
+    'یزد': 4.4,
+    'کاشان': 4.6,
+    'تبریز': 4.3,
+    'قم': 4.1,
+    'کرج': 3.8,
+    'اهواز': 3.9
+})
+
+_ATTRACTION_SIGNIFICANCE = types.MappingProxyType({
+    'تخت جمشید': 5.0,
+    'میدان امام': 4.8,
+    'حرم امام رضا': 4.9,
+    'باغ ارم': 4.5,
+    'کاخ گلستان': 4.5,
+    'مسجد نصیرالملک': 4.7,
+    'برج آزادی': 4.4,
+    'پل خواجو': 4.6,
+    'خانه بروجردی‌ها': 4.4,
+    'مسجد جامع یزد': 4.5
+})
+
+# Season of each month, indexed by month number (index 0 unused)
+_MONTH_TO_SEASON = (
+    None, 'winter', 'winter', 'spring', 'spring', 'spring',
+    'summer', 'summer', 'summer', 'fall', 'fall', 'fall', 'winter'
+)
+
+# Lowercase, since intents are extracted from the lowercased text
+_SEASONAL_TERMS = types.MappingProxyType({
+    'spring': ('بهار', 'spring', 'نوروز', 'nowruz'),
+    'summer': ('تابستان', 'summer'),
+    'fall': ('پاییز', 'fall', 'autumn'),
+    'winter': ('زمستان', 'winter', 'یلدا', 'yalda')
+})
+
+_LOCAL_CUSTOMS = types.MappingProxyType({
+    'spring': ('نوروز celebrations', 'Haft-sin table', 'Sizdah Bedar picnic'),
+    'summer': ('Evening gatherings', 'Tea ceremonies', 'Garden visits'),
+    'fall': ('Religious observances', 'Traditional cooking', 'Family gatherings'),
+    'winter': ('Yalda celebrations', 'Indoor activities', 'Traditional foods')
+})
+
+_ACCESSIBILITY_CONSIDERATIONS = (
+    'Wheelchair accessibility in historical sites',
+    'Elevator availability in hotels',
+    'Ramp access in public places',
+    'Sign language interpretation',
+    'Audio descriptions for visually impaired'
+)
+
+def _intern_keys(mapping: Dict[str, Any]) -> Dict[str, Any]:
+    # Interned keys let lookups with the same term short-circuit on identity
+    return {sys.intern(key): value for key, value in mapping.items()}
+
+def _term_regex(term: str) -> str:
+    # English names only match whole words ('Tehran' must not hit 'Tehrany')
+    if term.isascii():
+        return rf'\b{re.escape(term)}\b'
+    return re.escape(term)
+
+class _TermScanner:
+    """Find every literal term that occurs in a text with a single regex pass"""
+    
+    def __init__(self, terms: Iterable[str]) -> None:
+        terms = sorted(set(terms), key=len, reverse=True)
+        # Zero-width lookahead so overlapping terms are tried at every position
+        self.regex: re.Pattern = re.compile(
+            '(?=(' + '|'.join(map(_term_regex, terms)) + '))', re.IGNORECASE
+        )
+        # Only the longest term matches at a position; it implies the terms it
+        # contains. Keys are lowercased since matches keep the text's casing.
+        self.implied: Dict[str, FrozenSet[str]] = {}
+        for term in terms:
+            contained = frozenset(
+                other for other in terms
+                if re.search(_term_regex(other), term, re.IGNORECASE)
+            )
+            self.implied[term.lower()] = self.implied.get(term.lower(), frozenset()) | contained
+        self.find = functools.lru_cache(maxsize=256)(self._find)
+    
+    def _find(self, text: str) -> FrozenSet[str]:
+        found: set = set()
+        for term in self.regex.findall(text):
+            found |= self.implied[term.lower()]
+        return frozenset(found)
+
+# Instances are shared through the LRU caches, so they are frozen
+@dataclass(frozen=True)
 class CulturalContext:
     season: str
     current_month: int
-    religious_events: List[str]
-    cultural_events: List[str]
-    local_customs: List[str]
-    accessibility_considerations: List[str]
+    religious_events: Tuple[Dict[str, str], ...]
+    cultural_events: Tuple[Dict[str, str], ...]
+    local_customs: Tuple[str, ...]
+    accessibility_considerations: Tuple[str, ...]
 
-@dataclass
+@dataclass(frozen=True)
 class ExtractedIntent:
     primary_intent: str
     confidence: float
@@ -27,31 +134,44 @@ class ExtractedIntent:
     seasonal_relevance: float
     cultural_significance: float
 
-@dataclass
+@dataclass(frozen=True)
 class IranianEntity:
     entity_type: str
     value: str
     persian_name: str
     english_name: str
     cultural_significance: float
-    location_data: Dict[str, Any]
+    location_data: Mapping[str, Any]
 
 class AdvancedNLPService:
-    def __init__(self):
+    def __init__(self) -> None:
         self.persian_pattern = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]')
         self.english_pattern = re.compile(r'[a-zA-Z]')
         
-        self.persian_to_english = self._load_persian_english_dict()
-        self.english_to_persian = {v: k for k, v in self.persian_to_english.items()}
-        
-        self.iranian_cultural_terms = self._load_iranian_cultural_terms()
-        self.intent_patterns = self._load_enhanced_intent_patterns()
-        self.iranian_entities = self._load_iranian_entities()
-        self.cultural_calendar = self._load_cultural_calendar()
-        
-        self.persian_nlp = None
-        self.english_nlp = None
-        self._initialize_spacy_models()
+        self.persian_to_english = _intern_keys(self._load_persian_english_dict())
+        self.english_to_persian = {sys.intern(v): k for k, v in self.persian_to_english.items()}
+        self.fa_to_en_regex = self._compile_translation_regex(self.persian_to_english)
+        self.en_to_fa_regex = self._compile_translation_regex(self.english_to_persian, word_boundary=True)
+        
+        self.iranian_cultural_terms = _intern_keys(self._load_iranian_cultural_terms())
+        self._cultural_term_keys = tuple(self.iranian_cultural_terms)
+        self.intent_patterns = _intern_keys(self._load_enhanced_intent_patterns())
+        self.intent_regexes = self._compile_intent_patterns()
+        self.iranian_entities = {
+            kind: _intern_keys(entries) for kind, entries in self._load_iranian_entities().items()
+        }
+        self.cultural_calendar = _intern_keys(self._load_cultural_calendar())
+        self.calendar_by_season_type = self._index_cultural_calendar()
+        self.term_scanner = _TermScanner(self._collect_scanned_terms())
+        # Entities are built once and shared by every extraction that finds them
+        self.entity_templates = self._build_entity_templates()
+        # (day, context) pair; the cultural context only changes once a day
+        self._cultural_context_cache: Optional[Tuple[date, CulturalContext]] = None
+        
+        # Repeated queries (retries, suggestion clicks) are served from these caches
+        self._language_cache = functools.lru_cache(maxsize=4096)(self._detect_language)
+        self._intent_cache = functools.lru_cache(maxsize=4096)(self._extract_enhanced_intent)
+        self._entities_cache = functools.lru_cache(maxsize=4096)(self._extract_iranian_entities)
     
     def _load_persian_english_dict(self) -> Dict[str, str]:
         return {
@@ -139,6 +259,13 @@ class AdvancedNLPService:
             'اقتصادی': 'economical'
         }
     
+    def _compile_translation_regex(self, mapping: Dict[str, str], word_boundary: bool = False) -> re.Pattern:
+        # Longest keys first so multi-word phrases win over the words inside them
+        alternation = '|'.join(map(re.escape, sorted(mapping, key=len, reverse=True))) or '(?!)'
+        if word_boundary:
+            return re.compile(rf'\b(?:{alternation})\b')
+        return re.compile(alternation)
+    
     def _load_iranian_cultural_terms(self) -> Dict[str, Dict[str, Any]]:
         return {
             'نوروز': {
@@ -180,101 +307,108 @@ class AdvancedNLPService:
     def _load_enhanced_intent_patterns(self) -> Dict[str, List[str]]:
         return {
             'route_request': [
-                r'مسیر.*(?:از|به|بین).*',
-                r'راه.*(?:از|به|بین).*',
-                r'سفر.*(?:از|به|بین).*',
-                r'برو.*(?:از|به|بین).*',
-                r'چطور.*(?:برم|برسیم).*',
-                r'مسیر.*(?:پیشنهاد|پیدا).*',
-                r'route.*(?:from|to|between).*',
-                r'way.*(?:from|to|between).*',
-                r'travel.*(?:from|to|between).*',
-                r'go.*(?:from|to|between).*',
-                r'how.*(?:to|from|get).*',
-                r'path.*(?:from|to|between).*'
+                r'مسیر.*(?:از|به|بین)',
+                r'راه.*(?:از|به|بین)',
+                r'سفر.*(?:از|به|بین)',
+                r'برو.*(?:از|به|بین)',
+                r'چطور.*(?:برم|برسیم)',
+                r'مسیر.*(?:پیشنهاد|پیدا)',
+                r'route.*(?:from|to|between)',
+                r'way.*(?:from|to|between)',
+                r'travel.*(?:from|to|between)',
+                r'go.*(?:from|to|between)',
+                r'how.*(?:to|from|get)',
+                r'path.*(?:from|to|between)'
             ],
             'cultural_heritage_request': [
-                r'میراث.*فرهنگی.*',
-                r'مکان.*تاریخی.*',
-                r'بنا.*تاریخی.*',
-                r'کاخ.*',
-                r'مسجد.*',
-                r'موزه.*',
-                r'cultural.*heritage.*',
-                r'historical.*site.*',
-                r'palace.*',
-                r'mosque.*',
-                r'museum.*',
-                r'ancient.*site.*'
+                r'میراث.*فرهنگی',
+                r'مکان.*تاریخی',
+                r'بنا.*تاریخی',
+                r'کاخ',
+                r'مسجد',
+                r'موزه',
+                r'cultural.*heritage',
+                r'historical.*site',
+                r'palace',
+                r'mosque',
+                r'museum',
+                r'ancient.*site'
             ],
             'religious_pilgrimage_request': [
-                r'زیارت.*',
-                r'حرم.*',
-                r'مقبره.*',
-                r'آرامگاه.*',
-                r'مذهبی.*',
-                r'pilgrimage.*',
-                r'shrine.*',
-                r'tomb.*',
-                r'religious.*',
-                r'sacred.*site.*'
+                r'زیارت',
+                r'حرم',
+                r'مقبره',
+                r'آرامگاه',
+                r'مذهبی',
+                r'pilgrimage',
+                r'shrine',
+                r'tomb',
+                r'religious',
+                r'sacred.*site'
             ],
             'seasonal_planning_request': [
-                r'بهار.*',
-                r'تابستان.*',
-                r'پاییز.*',
-                r'زمستان.*',
-                r'نوروز.*',
-                r'فصل.*',
-                r'spring.*',
-                r'summer.*',
-                r'fall.*',
-                r'winter.*',
-                r'season.*',
-                r'Nowruz.*'
+                r'بهار',
+                r'تابستان',
+                r'پاییز',
+                r'زمستان',
+                r'نوروز',
+                r'فصل',
+                r'spring',
+                r'summer',
+                r'fall',
+                r'winter',
+                r'season',
+                r'Nowruz'
             ],
             'budget_request': [
-                r'بودجه.*',
-                r'هزینه.*',
-                r'قیمت.*',
-                r'ارزان.*',
-                r'گران.*',
-                r'اقتصادی.*',
-                r'budget.*',
-                r'cost.*',
-                r'price.*',
-                r'cheap.*',
-                r'expensive.*',
-                r'economical.*'
+                r'بودجه',
+                r'هزینه',
+                r'قیمت',
+                r'ارزان',
+                r'گران',
+                r'اقتصادی',
+                r'budget',
+                r'cost',
+                r'price',
+                r'cheap',
+                r'expensive',
+                r'economical'
             ],
             'accessibility_request': [
-                r'دسترسی.*',
-                r'ویلچر.*',
-                r'آسانسور.*',
-                r'معلولیت.*',
-                r'رامپ.*',
-                r'accessibility.*',
-                r'wheelchair.*',
-                r'elevator.*',
-                r'disability.*',
-                r'ramp.*'
+                r'دسترسی',
+                r'ویلچر',
+                r'آسانسور',
+                r'معلولیت',
+                r'رامپ',
+                r'accessibility',
+                r'wheelchair',
+                r'elevator',
+                r'disability',
+                r'ramp'
             ],
             'food_culture_request': [
-                r'غذا.*',
-                r'رستوران.*',
-                r'کباب.*',
-                r'برنج.*',
-                r'چای.*',
-                r'گلاب.*',
-                r'food.*',
-                r'restaurant.*',
-                r'kebab.*',
-                r'rice.*',
-                r'tea.*',
-                r'rosewater.*'
+                r'غذا',
+                r'رستوران',
+                r'کباب',
+                r'برنج',
+                r'چای',
+                r'گلاب',
+                r'food',
+                r'restaurant',
+                r'kebab',
+                r'rice',
+                r'tea',
+                r'rosewater'
             ]
         }
     
+    def _compile_intent_patterns(self) -> Dict[str, re.Pattern]:
+        # One alternation per intent, so each intent costs a single scan of the text
+        return {
+            intent: re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+            for intent, patterns in self.intent_patterns.items()
+        }
+    
     def _load_iranian_entities(self) -> Dict[str, Dict[str, Any]]:
         return {
             'cities': {
@@ -303,6 +437,16 @@ class AdvancedNLPService:
             }
         }
     
+    def _collect_scanned_terms(self) -> List[str]:
+        terms = list(_UNESCO_TERMS | _RELIGIOUS_TERMS | _HISTORICAL_TERMS)
+        for city_fa, city_data in self.iranian_entities['cities'].items():
+            terms += [city_fa, city_data['en']]
+        for attr_fa, attr_data in self.iranian_entities['attractions'].items():
+            terms += [attr_fa, attr_data['en']]
+        for term_fa, term_data in self.iranian_cultural_terms.items():
+            terms += [term_fa, term_data['english']]
+        return terms
+    
     def _load_cultural_calendar(self) -> Dict[str, List[Dict[str, Any]]]:
         return {
             'spring': [
@@ -323,28 +467,51 @@ class AdvancedNLPService:
             ]
         }
     
-    def _initialize_spacy_models(self):
+    def _index_cultural_calendar(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        index = {}
+        for season, events in self.cultural_calendar.items():
+            by_type = {'religious': [], 'cultural': [], 'national': []}
+            for event in events:
+                by_type.setdefault(event['type'], []).append(event)
+            index[season] = by_type
+        return index
+    
+    # spaCy models are only loaded when an NLP code path first needs them
+    @functools.cached_property
+    def persian_nlp(self) -> Optional[Language]:
         try:
-            self.persian_nlp = spacy.load("xx_ent_wiki_sm")
+            nlp = spacy.load("xx_ent_wiki_sm")
             logger.info("Persian spaCy model loaded successfully")
+            return nlp
         except OSError:
             logger.warning("Persian spaCy model not available. Install with: python -m spacy download xx_ent_wiki_sm")
-            self.persian_nlp = None
-        
+            return None
+    
+    @functools.cached_property
+    def english_nlp(self) -> Optional[Language]:
         try:
-            self.english_nlp = spacy.load("en_core_web_sm")
+            nlp = spacy.load("en_core_web_sm", exclude=_UNUSED_SPACY_COMPONENTS)
             logger.info("English spaCy model loaded successfully")
+            return nlp
         except OSError:
             logger.warning("English spaCy model not available. Install with: python -m spacy download en_core_web_sm")
-            self.english_nlp = None
+            return None
     
     def detect_language(self, text: str) -> str:
-        persian_chars = len(self.persian_pattern.findall(text))
-        english_chars = len(self.english_pattern.findall(text))
+        return self._language_cache(text)
+    
+    def _detect_language(self, text: str) -> str:
+        persian_chars = len(text) - len(text.translate(_PERSIAN_DELETE))
+        # A Persian majority of the whole text already outnumbers any English
+        if persian_chars * 2 > len(text):
+            return 'fa'
         
-        iranian_terms = sum(1 for term in self.iranian_cultural_terms.keys() if term in text)
+        english_chars = len(text) - len(text.translate(_ENGLISH_DELETE))
+        if persian_chars > english_chars:
+            return 'fa'
         
-        if persian_chars > english_chars or iranian_terms > 0:
+        # Cultural terms are only scanned when the character counts do not decide
+        if not self.term_scanner.find(text).isdisjoint(self._cultural_term_keys):
             return 'fa'
         elif english_chars > persian_chars:
             return 'en'
@@ -352,22 +519,19 @@ class AdvancedNLPService:
             return 'mixed'
     
     def extract_enhanced_intent(self, text: str, lang: str = 'auto') -> ExtractedIntent:
+        # Refresh the daily context first; a new day drops the cached intents
+        self._get_cultural_context()
+        # Matching is case-insensitive, so differently cased texts share an entry
+        return self._intent_cache(text.strip().lower(), lang)
+    
+    def _extract_enhanced_intent(self, text: str, lang: str) -> ExtractedIntent:
         if lang == 'auto':
             lang = self.detect_language(text)
         
         cultural_context = self._get_cultural_context()
         
-        primary_intent = 'unknown'
-        confidence = 0.0
-        
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    primary_intent = intent
-                    confidence = 0.8
-                    break
-            if primary_intent != 'unknown':
-                break
+        primary_intent = self._first_intent(text)
+        confidence = 0.8 if primary_intent != 'unknown' else 0.0
         
         cultural_relevance = self._calculate_cultural_relevance(text, cultural_context)
         seasonal_relevance = self._calculate_seasonal_relevance(text, cultural_context)
@@ -381,111 +545,114 @@ class AdvancedNLPService:
             cultural_significance=cultural_significance
         )
     
+    def _first_intent(self, text: str) -> str:
+        for intent, regex in self.intent_regexes.items():
+            if regex.search(text):
+                return intent
+        return 'unknown'
+    
     def extract_iranian_entities(self, text: str, lang: str) -> List[IranianEntity]:
+        return list(self._entities_cache(text.strip().lower(), lang))
+    
+    def _build_entity_templates(self) -> Tuple[IranianEntity, ...]:
         entities = []
         
         for city_fa, city_data in self.iranian_entities['cities'].items():
-            if city_fa in text or city_data['en'] in text:
-                entities.append(IranianEntity(
-                    entity_type='city',
-                    value=city_data['en'],
-                    persian_name=city_fa,
-                    english_name=city_data['en'],
-                    cultural_significance=self._get_city_significance(city_fa),
-                    location_data={'province': city_data['province'], 'significance': city_data['significance']}
-                ))
+            entities.append(IranianEntity(
+                entity_type='city',
+                value=city_data['en'],
+                persian_name=city_fa,
+                english_name=city_data['en'],
+                cultural_significance=self._get_city_significance(city_fa),
+                location_data=types.MappingProxyType({'province': city_data['province'], 'significance': city_data['significance']})
+            ))
         
         for attr_fa, attr_data in self.iranian_entities['attractions'].items():
-            if attr_fa in text or attr_data['en'] in text:
-                entities.append(IranianEntity(
-                    entity_type='attraction',
-                    value=attr_data['en'],
-                    persian_name=attr_fa,
-                    english_name=attr_data['en'],
-                    cultural_significance=self._get_attraction_significance(attr_fa),
-                    location_data={'city': attr_data['city'], 'category': attr_data['category']}
-                ))
+            entities.append(IranianEntity(
+                entity_type='attraction',
+                value=attr_data['en'],
+                persian_name=attr_fa,
+                english_name=attr_data['en'],
+                cultural_significance=self._get_attraction_significance(attr_fa),
+                location_data=types.MappingProxyType({'city': attr_data['city'], 'category': attr_data['category']})
+            ))
         
         for term_fa, term_data in self.iranian_cultural_terms.items():
-            if term_fa in text or term_data['english'] in text:
-                entities.append(IranianEntity(
-                    entity_type='cultural_term',
-                    value=term_data['english'],
-                    persian_name=term_fa,
-                    english_name=term_data['english'],
-                    cultural_significance=term_data.get('cultural_importance', 3.0),
-                    location_data=term_data
-                ))
-        
-        return entities
+            entities.append(IranianEntity(
+                entity_type='cultural_term',
+                value=term_data['english'],
+                persian_name=term_fa,
+                english_name=term_data['english'],
+                cultural_significance=term_data.get('cultural_importance', 3.0),
+                location_data=types.MappingProxyType(term_data)
+            ))
+        
+        return tuple(entities)
+    
+    def _extract_iranian_entities(self, text: str, lang: str) -> Tuple[IranianEntity, ...]:
+        found = self.term_scanner.find(text)
+        return tuple(
+            entity for entity in self.entity_templates
+            if entity.persian_name in found or entity.english_name in found
+        )
+    
+    def extract_batch(self, texts: List[str], lang_hint: Optional[str] = None) -> List[Tuple[ExtractedIntent, List[IranianEntity]]]:
+        self._get_cultural_context()
+        results = []
+        for text in texts:
+            lang = lang_hint or self.detect_language(text)
+            key = text.strip().lower()
+            results.append((self._intent_cache(key, lang), list(self._entities_cache(key, lang))))
+        return results
     
     def _get_cultural_context(self) -> CulturalContext:
-        now = datetime.now()
-        current_month = now.month
-        
-        if current_month in [3, 4, 5]:
-            season = 'spring'
-        elif current_month in [6, 7, 8]:
-            season = 'summer'
-        elif current_month in [9, 10, 11]:
-            season = 'fall'
-        else:
-            season = 'winter'
+        today = date.today()
+        cached = self._cultural_context_cache
+        if cached is not None and cached[0] == today:
+            return cached[1]
+        
+        current_month = today.month
+        season = _MONTH_TO_SEASON[current_month]
         
-        current_events = self.cultural_calendar.get(season, [])
+        season_events = self.calendar_by_season_type.get(season, {})
         
-        return CulturalContext(
+        context = CulturalContext(
             season=season,
             current_month=current_month,
-            religious_events=[e for e in current_events if e['type'] == 'religious'],
-            cultural_events=[e for e in current_events if e['type'] == 'cultural'],
+            religious_events=tuple(season_events.get('religious', ())),
+            cultural_events=tuple(season_events.get('cultural', ())),
             local_customs=self._get_local_customs(season),
             accessibility_considerations=self._get_accessibility_considerations()
         )
+        self._cultural_context_cache = (today, context)
+        self._intent_cache.cache_clear()
+        return context
     
-    def _get_local_customs(self, season: str) -> List[str]:
-        customs = {
-            'spring': ['نوروز celebrations', 'Haft-sin table', 'Sizdah Bedar picnic'],
-            'summer': ['Evening gatherings', 'Tea ceremonies', 'Garden visits'],
-            'fall': ['Religious observances', 'Traditional cooking', 'Family gatherings'],
-            'winter': ['Yalda celebrations', 'Indoor activities', 'Traditional foods']
-        }
-        return customs.get(season, [])
+    def _get_local_customs(self, season: str) -> Tuple[str, ...]:
+        return _LOCAL_CUSTOMS.get(season, ())
     
-    def _get_accessibility_considerations(self) -> List[str]:
-        return [
-            'Wheelchair accessibility in historical sites',
-            'Elevator availability in hotels',
-            'Ramp access in public places',
-            'Sign language interpretation',
-            'Audio descriptions for visually impaired'
-        ]
+    def _get_accessibility_considerations(self) -> Tuple[str, ...]:
+        return _ACCESSIBILITY_CONSIDERATIONS
     
     def _calculate_cultural_relevance(self, text: str, context: CulturalContext) -> float:
-        relevance = 0.0
+        relevance: float = 0.0
+        found = self.term_scanner.find(text)
         
-        for term in self.iranian_cultural_terms.keys():
-            if term in text:
+        for term in self._cultural_term_keys:
+            if term in found:
                 relevance += 0.3
         
         if context.season in text:
             relevance += 0.2
         
         for event in context.cultural_events + context.religious_events:
-            if event['name_fa'] in text or event['name_en'] in text:
+            if event['name_fa'] in text or event['name_en'].lower() in text:
                 relevance += 0.4
         
         return min(relevance, 1.0)
     
     def _calculate_seasonal_relevance(self, text: str, context: CulturalContext) -> float:
-        seasonal_terms = {
-            'spring': ['بهار', 'spring', 'نوروز', 'Nowruz'],
-            'summer': ['تابستان', 'summer'],
-            'fall': ['پاییز', 'fall', 'autumn'],
-            'winter': ['زمستان', 'winter', 'یلدا', 'Yalda']
-        }
-        
-        current_season_terms = seasonal_terms.get(context.season, [])
+        current_season_terms = _SEASONAL_TERMS.get(context.season, ())
         
         for term in current_season_terms:
             if term in text:
@@ -494,54 +661,28 @@ class AdvancedNLPService:
         return 0.0
     
     def _calculate_cultural_significance(self, text: str) -> float:
-        significance = 0.0
+        significance: float = 0.0
+        found = self.term_scanner.find(text)
         
-        unesco_terms = ['تخت جمشید', 'میدان امام', 'باغ ارم', 'Persepolis', 'Imam Square', 'Eram Garden']
-        for term in unesco_terms:
-            if term in text:
+        for term in _UNESCO_TERMS:
+            if term in found:
                 significance += 0.5
         
-        religious_terms = ['حرم', 'مسجد', 'زیارت', 'shrine', 'mosque', 'pilgrimage']
-        for term in religious_terms:
-            if term in text:
+        for term in _RELIGIOUS_TERMS:
+            if term in found:
                 significance += 0.3
         
-        historical_terms = ['تاریخی', 'کاخ', 'موزه', 'historical', 'palace', 'museum']
-        for term in historical_terms:
-            if term in text:
+        for term in _HISTORICAL_TERMS:
+            if term in found:
                 significance += 0.2
         
         return min(significance, 1.0)
     
     def _get_city_significance(self, city_name: str) -> float:
-        significance_map = {
-            'اصفهان': 4.8,
-            'شیراز': 4.7,
-            'مشهد': 4.9,
-            'تهران': 4.2,
-            'یزد': 4.4,
-            'کاشان': 4.6,
-            'تبریز': 4.3,
-            'قم': 4.1,
-            'کرج': 3.8,
-            'اهواز': 3.9
-        }
-        return significance_map.get(city_name, 3.0)
+        return _CITY_SIGNIFICANCE.get(city_name, 3.0)
     
     def _get_attraction_significance(self, attraction_name: str) -> float:
-        significance_map = {
-            'تخت جمشید': 5.0,
-            'میدان امام': 4.8,
-            'حرم امام رضا': 4.9,
-            'باغ ارم': 4.5,
-            'کاخ گلستان': 4.5,
-            'مسجد نصیرالملک': 4.7,
-            'برج آزادی': 4.4,
-            'پل خواجو': 4.6,
-            'خانه بروجردی‌ها': 4.4,
-            'مسجد جامع یزد': 4.5
-        }
-        return significance_map.get(attraction_name, 3.0)
+        return _ATTRACTION_SIGNIFICANCE.get(attraction_name, 3.0)
     
     def generate_culturally_aware_response(
         self, 
@@ -603,15 +744,11 @@ class AdvancedNLPService:
     
     def translate_with_cultural_context(self, text: str, target_lang: str) -> str:
         if target_lang == 'en':
-            translated = text
-            for persian, english in self.persian_to_english.items():
-                translated = translated.replace(persian, english)
-            return translated
+            mapping = self.persian_to_english
+            return self.fa_to_en_regex.sub(lambda m: mapping[m.group(0)], text)
         elif target_lang == 'fa':
-            translated = text
-            for english, persian in self.english_to_persian.items():
-                translated = translated.replace(english, persian)
-            return translated
+            mapping = self.english_to_persian
+            return self.en_to_fa_regex.sub(lambda m: mapping[m.group(0)], text)
         return text
     
     def get_cultural_recommendations(self, user_interests: List[str], lang: str) -> List[Dict[str, Any]]:
@@ -3,17 +3,279 @@ Iran-Focused Map Service
 Interactive mapping service for Iranian travel with cultural context
 """
 
+import copy
+import gzip
 import folium
+import numpy as np
+from folium.plugins import MarkerCluster
 import json
 import requests
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+from types import MappingProxyType
+from dataclasses import dataclass, field
+import functools
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    # Fallback to the standard library decoder
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Popup templates for map points, filled once per point (kept minified,
+# they are embedded once per marker in the exported HTML)
+_POPUP_TEMPLATE_FA = (
+    '<div style="width: 200px;">'
+    '<h4>{name}</h4>'
+    '<p><strong>دسته‌بندی:</strong> {category}</p>'
+    '<p><strong>امتیاز فرهنگی:</strong> {cultural_significance:.1f}/5.0</p>'
+    '<p><strong>امتیاز کلی:</strong> {rating:.1f}/5.0</p>'
+    '<p>{description}</p>'
+    '</div>'
+)
+
+_POPUP_TEMPLATE_EN = (
+    '<div style="width: 200px;">'
+    '<h4>{name}</h4>'
+    '<p><strong>Category:</strong> {category}</p>'
+    '<p><strong>Cultural Significance:</strong> {cultural_significance:.1f}/5.0</p>'
+    '<p><strong>Rating:</strong> {rating:.1f}/5.0</p>'
+    '<p>{description}</p>'
+    '</div>'
+)
+
+# Default headers for the external routing/POI APIs
+HTTP_HEADERS = {
+    'User-Agent': 'iran_map_service/1.0',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+# Response cache limits for the external routing/POI APIs
+ROUTE_CACHE_SIZE = 1024
+ROUTE_CACHE_TTL = 24 * 3600
+PLACES_CACHE_SIZE = 2048
+PLACES_CACHE_TTL = 3600
+
+# Marker icon styles used on route maps
+_ORIGIN_ICON_KW = MappingProxyType({'color': 'green', 'icon': 'play', 'prefix': 'fa'})
+_DESTINATION_ICON_KW = MappingProxyType({'color': 'red', 'icon': 'flag-checkered', 'prefix': 'fa'})
+_WAYPOINT_ICON_KW = MappingProxyType({'color': 'blue', 'icon': 'map-marker', 'prefix': 'fa'})
+_HIGHLIGHT_ICON_KW = MappingProxyType({'color': 'purple', 'icon': 'star', 'prefix': 'fa'})
+
+# Overpass node selectors per place category
+_OVERPASS_SELECTORS: Mapping[str, str] = MappingProxyType({
+    'tourism': 'node["tourism"]',
+    'historic': 'node["historic"]',
+    'religious': 'node["religion"]',
+    'restaurant': 'node["amenity"="restaurant"]',
+    'hotel': 'node["tourism"="hotel"]'
+})
+
+# Place category rules in priority order: a tag key, or a (key, value) pair
+_TAG_CATEGORY_RULES: Tuple[Tuple[Any, str], ...] = (
+    ('historic', 'historical'),
+    (('amenity', 'restaurant'), 'restaurant'),
+    (('tourism', 'hotel'), 'hotel'),
+    ('tourism', 'tourist'),
+    ('religion', 'religious')
+)
+_CATEGORY_TAG_KEYS = frozenset(('historic', 'amenity', 'tourism', 'religion'))
+
+# Overpass query templates; coordinates are normalised to 6 decimals
+_OVERPASS_CLAUSE_TEMPLATE = '{selector}(around:{radius},{lat:.6f},{lng:.6f});'
+_OVERPASS_QUERY_TEMPLATE = (
+    '[out:json][timeout:25];\n'
+    '(\n{body}\n);\n'
+    'out body;\n'
+    '>;\n'
+    'out skel qt;\n'
+)
+
+# Static reference data, shared by every IranMapService instance
+
+# Iranian provinces boundaries (simplified)
+_PROVINCE_BOUNDARIES: Mapping[str, List[List[float]]] = MappingProxyType({
+    'تهران': [[35.5, 50.5], [35.9, 51.5]],
+    'اصفهان': [[32.0, 51.0], [33.5, 52.5]],
+    'فارس': [[29.0, 52.0], [30.5, 53.5]],
+    'آذربایجان شرقی': [[37.5, 45.5], [39.0, 47.0]],
+    'خراسان رضوی': [[35.5, 58.0], [37.0, 60.0]],
+    'یزد': [[31.0, 53.5], [32.5, 55.0]],
+    'کاشان': [[33.5, 51.0], [34.5, 52.0]],
+    'قم': [[34.0, 50.5], [35.0, 51.5]],
+    'البرز': [[35.5, 50.5], [36.0, 51.0]],
+    'خوزستان': [[30.5, 48.0], [32.0, 49.5]]
+})
+
+# Province boxes as one (N, 4) array of lat_min, lng_min, lat_max, lng_max
+# for point-in-province lookups
+_PROVINCE_NAMES: Tuple[str, ...] = tuple(_PROVINCE_BOUNDARIES)
+_PROVINCE_BOXES = np.array(
+    [[sw[0], sw[1], ne[0], ne[1]] for sw, ne in _PROVINCE_BOUNDARIES.values()],
+    dtype=np.float64
+)
+
+# Iranian cultural zones
+_CULTURAL_ZONES: Mapping[str, Dict[str, Any]] = MappingProxyType({
+    'central_iran': {
+        'name_fa': 'ایران مرکزی',
+        'name_en': 'Central Iran',
+        'cities': ['تهران', 'اصفهان', 'کاشان', 'قم'],
+        'characteristics': ['historical', 'cultural', 'religious'],
+        'color': 'red'
+    },
+    'southern_iran': {
+        'name_fa': 'جنوب ایران',
+        'name_en': 'Southern Iran',
+        'cities': ['شیراز', 'یزد', 'اهواز'],
+        'characteristics': ['historical', 'traditional', 'desert'],
+        'color': 'orange'
+    },
+    'northern_iran': {
+        'name_fa': 'شمال ایران',
+        'name_en': 'Northern Iran',
+        'cities': ['تبریز', 'مشهد'],
+        'characteristics': ['religious', 'historical', 'mountainous'],
+        'color': 'green'
+    }
+})
+
+# Simplified polygons for the cultural zones
+_ZONE_COORDINATES: Mapping[str, List[List[float]]] = MappingProxyType({
+    'central_iran': [
+        [35.0, 50.5], [35.0, 52.5],
+        [33.0, 52.5], [33.0, 50.5]
+    ],
+    'southern_iran': [
+        [30.0, 52.0], [30.0, 54.0],
+        [28.0, 54.0], [28.0, 52.0]
+    ],
+    'northern_iran': [
+        [37.0, 45.0], [37.0, 47.0],
+        [35.0, 47.0], [35.0, 45.0]
+    ]
+})
+
+# Cultural zones as a single GeoJSON FeatureCollection ([lng, lat] order, closed rings)
+_CULTURAL_ZONES_GEOJSON: Dict[str, Any] = {
+    'type': 'FeatureCollection',
+    'features': [
+        {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [[[lng, lat] for lat, lng in (*coords, coords[0])]]
+            },
+            'properties': {
+                'name': f"<b>{_CULTURAL_ZONES[zone_id]['name_en']}</b><br>Cultural Zone",
+                'color': _CULTURAL_ZONES[zone_id]['color']
+            }
+        }
+        for zone_id, coords in _ZONE_COORDINATES.items()
+        if zone_id in _CULTURAL_ZONES
+    ]
+}
+
+# UNESCO World Heritage Sites in Iran
+_UNESCO_SITES: Tuple[Dict[str, Any], ...] = (
+    {
+        'name_fa': 'تخت جمشید',
+        'name_en': 'Persepolis',
+        'lat': 29.9354,
+        'lng': 52.8916,
+        'category': 'cultural',
+        'year_inscribed': 1979,
+        'description_fa': 'پایتخت امپراتوری هخامنشی',
+        'description_en': 'Capital of Achaemenid Empire'
+    },
+    {
+        'name_fa': 'میدان امام',
+        'name_en': 'Imam Square',
+        'lat': 32.6577,
+        'lng': 51.6775,
+        'category': 'cultural',
+        'year_inscribed': 1979,
+        'description_fa': 'میدان تاریخی اصفهان',
+        'description_en': 'Historical square of Isfahan'
+    },
+    {
+        'name_fa': 'باغ ارم',
+        'name_en': 'Eram Garden',
+        'lat': 29.6361,
+        'lng': 52.5247,
+        'category': 'cultural',
+        'year_inscribed': 2011,
+        'description_fa': 'باغ تاریخی شیراز',
+        'description_en': 'Historical garden of Shiraz'
+    },
+    {
+        'name_fa': 'کاخ گلستان',
+        'name_en': 'Golestan Palace',
+        'lat': 35.6804,
+        'lng': 51.4203,
+        'category': 'cultural',
+        'year_inscribed': 2013,
+        'description_fa': 'کاخ سلطنتی قاجار',
+        'description_en': 'Qajar royal palace'
+    },
+    {
+        'name_fa': 'شوشتر',
+        'name_en': 'Shushtar',
+        'lat': 32.0456,
+        'lng': 48.8567,
+        'category': 'cultural',
+        'year_inscribed': 2009,
+        'description_fa': 'سیستم آبیاری تاریخی',
+        'description_en': 'Historical hydraulic system'
+    }
+)
+
+# Site coordinates as arrays for vectorized bounding-box filtering
+_UNESCO_LATS = np.fromiter((site['lat'] for site in _UNESCO_SITES), dtype=np.float64, count=len(_UNESCO_SITES))
+_UNESCO_LNGS = np.fromiter((site['lng'] for site in _UNESCO_SITES), dtype=np.float64, count=len(_UNESCO_SITES))
+
+# Offline pack bounding boxes: (lat_min, lat_max, lng_min, lng_max)
+_REGION_BBOXES: Mapping[str, Tuple[float, float, float, float]] = MappingProxyType({
+    'central_iran': (32.0, 36.0, 50.0, 53.0)
+})
+
+# Historical trade and cultural routes
+_HISTORICAL_ROUTES: Tuple[Dict[str, Any], ...] = (
+    {
+        'name_fa': 'جاده ابریشم',
+        'name_en': 'Silk Road',
+        'route_type': 'trade',
+        'significance': 'Major trade route connecting East and West',
+        'points': [
+            {'lat': 35.6892, 'lng': 51.3890, 'name': 'تهران'},
+            {'lat': 32.6546, 'lng': 51.6680, 'name': 'اصفهان'},
+            {'lat': 29.5916, 'lng': 52.5836, 'name': 'شیراز'}
+        ]
+    },
+    {
+        'name_fa': 'مسیر زیارتی',
+        'name_en': 'Pilgrimage Route',
+        'route_type': 'religious',
+        'significance': 'Route connecting major religious sites',
+        'points': [
+            {'lat': 35.6892, 'lng': 51.3890, 'name': 'تهران'},
+            {'lat': 34.6416, 'lng': 50.8746, 'name': 'قم'},
+            {'lat': 36.2605, 'lng': 59.6168, 'name': 'مشهد'}
+        ]
+    }
+)
+
+@dataclass(slots=True)
 class MapPoint:
     """Map point with cultural information"""
     lat: float
@@ -26,8 +288,26 @@ class MapPoint:
     description_en: str
     photos: List[str]
     rating: float
+    popup_fa: str = field(init=False, repr=False)
+    popup_en: str = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.popup_fa = _POPUP_TEMPLATE_FA.format(
+            name=self.name_fa,
+            category=self.category,
+            cultural_significance=self.cultural_significance,
+            rating=self.rating,
+            description=self.description_fa
+        )
+        self.popup_en = _POPUP_TEMPLATE_EN.format(
+            name=self.name_en,
+            category=self.category,
+            cultural_significance=self.cultural_significance,
+            rating=self.rating,
+            description=self.description_en
+        )
 
-@dataclass
+@dataclass(slots=True)
 class RouteInfo:
     """Route information for mapping"""
     origin: MapPoint
@@ -38,6 +318,74 @@ class RouteInfo:
     route_type: str  # direct, with_waypoints, cultural_tour
     cultural_highlights: List[MapPoint]
 
+# Tour cities by name, prebuilt as map points
+_CITY_DB: Mapping[str, MapPoint] = MappingProxyType({
+    'تهران': MapPoint(
+        lat=35.6892, lng=51.3890,
+        name_fa='تهران', name_en='Tehran',
+        category='cultural_tour',
+        cultural_significance=4.2,
+        description_fa='پایتخت ایران و مرکز سیاسی و اقتصادی',
+        description_en='Capital of Iran and political/economic center',
+        photos=[],
+        rating=4.2
+    ),
+    'اصفهان': MapPoint(
+        lat=32.6546, lng=51.6680,
+        name_fa='اصفهان', name_en='Isfahan',
+        category='cultural_tour',
+        cultural_significance=4.8,
+        description_fa='شهر نصف جهان با معماری تاریخی باشکوه',
+        description_en='Half the World city with magnificent historical architecture',
+        photos=[],
+        rating=4.8
+    ),
+    'شیراز': MapPoint(
+        lat=29.5916, lng=52.5836,
+        name_fa='شیراز', name_en='Shiraz',
+        category='cultural_tour',
+        cultural_significance=4.7,
+        description_fa='شهر شعر و ادب و باغ‌های زیبا',
+        description_en='City of poetry and beautiful gardens',
+        photos=[],
+        rating=4.7
+    )
+})
+
+class _TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after a fixed TTL.
+    Expired entries stay available through peek() for revalidation until evicted.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+    
+    def peek(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry is not None else None
+    
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
 class IranMapService:
     """
     Iran-focused map service with cultural context
@@ -48,140 +396,48 @@ class IranMapService:
         self.osrm_base_url = "http://router.project-osrm.org/route/v1"
         self.overpass_base_url = "https://overpass-api.de/api/interpreter"
         
-        # Iranian provinces boundaries (simplified)
-        self.province_boundaries = self._load_province_boundaries()
-        
-        # Cultural zones
-        self.cultural_zones = self._load_cultural_zones()
-        
-        # UNESCO sites in Iran
-        self.unesco_sites = self._load_unesco_sites()
+        # Pooled HTTP session reused for OSRM and Overpass requests
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        self._http.headers.update(HTTP_HEADERS)
         
-        # Historical routes
-        self.historical_routes = self._load_historical_routes()
+        # (response, ETag) pairs keyed on quantized coordinates (~11 m for routes, ~110 m for places)
+        self._route_cache = _TTLCache(ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL)
+        self._places_cache = _TTLCache(PLACES_CACHE_SIZE, PLACES_CACHE_TTL)
     
-    def _load_province_boundaries(self) -> Dict[str, List[List[float]]]:
-        """Load Iranian province boundaries"""
-        return {
-            'تهران': [[35.5, 50.5], [35.9, 51.5]],
-            'اصفهان': [[32.0, 51.0], [33.5, 52.5]],
-            'فارس': [[29.0, 52.0], [30.5, 53.5]],
-            'آذربایجان شرقی': [[37.5, 45.5], [39.0, 47.0]],
-            'خراسان رضوی': [[35.5, 58.0], [37.0, 60.0]],
-            'یزد': [[31.0, 53.5], [32.5, 55.0]],
-            'اصفهان': [[33.5, 51.0], [34.5, 52.0]],  # Kashan
-            'قم': [[34.0, 50.5], [35.0, 51.5]],
-            'البرز': [[35.5, 50.5], [36.0, 51.0]],
-            'خوزستان': [[30.5, 48.0], [32.0, 49.5]]
-        }
+    @functools.cached_property
+    def province_boundaries(self) -> Mapping[str, List[List[float]]]:
+        """Iranian provinces boundaries (simplified)"""
+        return _PROVINCE_BOUNDARIES
     
-    def _load_cultural_zones(self) -> Dict[str, Dict[str, Any]]:
-        """Load Iranian cultural zones"""
-        return {
-            'central_iran': {
-                'name_fa': 'ایران مرکزی',
-                'name_en': 'Central Iran',
-                'cities': ['تهران', 'اصفهان', 'کاشان', 'قم'],
-                'characteristics': ['historical', 'cultural', 'religious'],
-                'color': 'red'
-            },
-            'southern_iran': {
-                'name_fa': 'جنوب ایران',
-                'name_en': 'Southern Iran',
-                'cities': ['شیراز', 'یزد', 'اهواز'],
-                'characteristics': ['historical', 'traditional', 'desert'],
-                'color': 'orange'
-            },
-            'northern_iran': {
-                'name_fa': 'شمال ایران',
-                'name_en': 'Northern Iran',
-                'cities': ['تبریز', 'مشهد'],
-                'characteristics': ['religious', 'historical', 'mountainous'],
-                'color': 'green'
-            }
-        }
+    @functools.cached_property
+    def cultural_zones(self) -> Mapping[str, Dict[str, Any]]:
+        """Cultural zones"""
+        return _CULTURAL_ZONES
     
-    def _load_unesco_sites(self) -> List[Dict[str, Any]]:
-        """Load UNESCO World Heritage Sites in Iran"""
-        return [
-            {
-                'name_fa': 'تخت جمشید',
-                'name_en': 'Persepolis',
-                'lat': 29.9354,
-                'lng': 52.8916,
-                'category': 'cultural',
-                'year_inscribed': 1979,
-                'description_fa': 'پایتخت امپراتوری هخامنشی',
-                'description_en': 'Capital of Achaemenid Empire'
-            },
-            {
-                'name_fa': 'میدان امام',
-                'name_en': 'Imam Square',
-                'lat': 32.6577,
-                'lng': 51.6775,
-                'category': 'cultural',
-                'year_inscribed': 1979,
-                'description_fa': 'میدان تاریخی اصفهان',
-                'description_en': 'Historical square of Isfahan'
-            },
-            {
-                'name_fa': 'باغ ارم',
-                'name_en': 'Eram Garden',
-                'lat': 29.6361,
-                'lng': 52.5247,
-                'category': 'cultural',
-                'year_inscribed': 2011,
-                'description_fa': 'باغ تاریخی شیراز',
-                'description_en': 'Historical garden of Shiraz'
-            },
-            {
-                'name_fa': 'کاخ گلستان',
-                'name_en': 'Golestan Palace',
-                'lat': 35.6804,
-                'lng': 51.4203,
-                'category': 'cultural',
-                'year_inscribed': 2013,
-                'description_fa': 'کاخ سلطنتی قاجار',
-                'description_en': 'Qajar royal palace'
-            },
-            {
-                'name_fa': 'شوشتر',
-                'name_en': 'Shushtar',
-                'lat': 32.0456,
-                'lng': 48.8567,
-                'category': 'cultural',
-                'year_inscribed': 2009,
-                'description_fa': 'سیستم آبیاری تاریخی',
-                'description_en': 'Historical hydraulic system'
-            }
-        ]
+    @functools.cached_property
+    def unesco_sites(self) -> Tuple[Dict[str, Any], ...]:
+        """UNESCO sites in Iran"""
+        return _UNESCO_SITES
     
-    def _load_historical_routes(self) -> List[Dict[str, Any]]:
-        """Load historical trade and cultural routes"""
-        return [
-            {
-                'name_fa': 'جاده ابریشم',
-                'name_en': 'Silk Road',
-                'route_type': 'trade',
-                'significance': 'Major trade route connecting East and West',
-                'points': [
-                    {'lat': 35.6892, 'lng': 51.3890, 'name': 'تهران'},
-                    {'lat': 32.6546, 'lng': 51.6680, 'name': 'اصفهان'},
-                    {'lat': 29.5916, 'lng': 52.5836, 'name': 'شیراز'}
-                ]
-            },
-            {
-                'name_fa': 'مسیر زیارتی',
-                'name_en': 'Pilgrimage Route',
-                'route_type': 'religious',
-                'significance': 'Route connecting major religious sites',
-                'points': [
-                    {'lat': 35.6892, 'lng': 51.3890, 'name': 'تهران'},
-                    {'lat': 34.6416, 'lng': 50.8746, 'name': 'قم'},
-                    {'lat': 36.2605, 'lng': 59.6168, 'name': 'مشهد'}
-                ]
-            }
-        ]
+    @functools.cached_property
+    def historical_routes(self) -> Tuple[Dict[str, Any], ...]:
+        """Historical routes"""
+        return _HISTORICAL_ROUTES
+    
+    def province_containing(self, lat: float, lng: float) -> Optional[str]:
+        """Return the first province whose bounding box contains the point"""
+        hits = np.flatnonzero(
+            (_PROVINCE_BOXES[:, 0] <= lat) & (lat <= _PROVINCE_BOXES[:, 2]) &
+            (_PROVINCE_BOXES[:, 1] <= lng) & (lng <= _PROVINCE_BOXES[:, 3])
+        )
+        return _PROVINCE_NAMES[hits[0]] if hits.size else None
     
     def create_iran_map(self, center: Optional[List[float]] = None, zoom: int = 6) -> folium.Map:
         """Create a base map centered on Iran"""
@@ -203,80 +459,73 @@ class IranMapService:
     
     def _add_cultural_overlay(self, m: folium.Map):
         """Add cultural overlay to the map"""
-        # Add UNESCO sites
+        # Add UNESCO sites, clustered client-side in a single layer
+        unesco_cluster = MarkerCluster(name="UNESCO").add_to(m)
         for site in self.unesco_sites:
             folium.Marker(
                 location=[site['lat'], site['lng']],
                 popup=f"<b>{site['name_en']}</b><br>{site['description_en']}<br>UNESCO {site['year_inscribed']}",
                 icon=folium.Icon(color='red', icon='star', prefix='fa'),
                 tooltip=f"UNESCO: {site['name_en']}"
-            ).add_to(m)
+            ).add_to(unesco_cluster)
         
-        # Add cultural zones
-        for zone_id, zone_data in self.cultural_zones.items():
-            # Create a polygon for the zone (simplified)
-            zone_coords = self._get_zone_coordinates(zone_id)
-            if zone_coords:
-                folium.Polygon(
-                    locations=zone_coords,
-                    popup=f"<b>{zone_data['name_en']}</b><br>Cultural Zone",
-                    color=zone_data['color'],
-                    fill=True,
-                    fillOpacity=0.1,
-                    weight=2
-                ).add_to(m)
+        # Add cultural zones (simplified polygons) as one GeoJSON layer
+        folium.GeoJson(
+            _CULTURAL_ZONES_GEOJSON,
+            name="Cultural zones",
+            style_function=self._zone_style,
+            popup=folium.GeoJsonPopup(fields=['name'], labels=False)
+        ).add_to(m)
     
-    def _get_zone_coordinates(self, zone_id: str) -> Optional[List[List[float]]]:
-        """Get coordinates for cultural zones"""
-        zone_coords = {
-            'central_iran': [
-                [35.0, 50.5], [35.0, 52.5],
-                [33.0, 52.5], [33.0, 50.5]
-            ],
-            'southern_iran': [
-                [30.0, 52.0], [30.0, 54.0],
-                [28.0, 54.0], [28.0, 52.0]
-            ],
-            'northern_iran': [
-                [37.0, 45.0], [37.0, 47.0],
-                [35.0, 47.0], [35.0, 45.0]
-            ]
+    @staticmethod
+    def _zone_style(feature: Dict[str, Any]) -> Dict[str, Any]:
+        """Leaflet style for a cultural zone feature"""
+        return {
+            'color': feature['properties']['color'],
+            'fill': True,
+            'fillOpacity': 0.1,
+            'weight': 2
         }
-        return zone_coords.get(zone_id)
     
     def add_route_to_map(self, m: folium.Map, route_info: RouteInfo, lang: str = 'en') -> folium.Map:
         """Add a route to the map with cultural context"""
+        # All route markers share one layer instead of attaching to the map one by one
+        route_layer = folium.FeatureGroup(name="Route").add_to(m)
         
         # Add origin marker
-        origin_icon = folium.Icon(color='green', icon='play', prefix='fa')
+        origin_icon = self._add_shared_icon(route_layer, _ORIGIN_ICON_KW)
         origin_popup = self._create_point_popup(route_info.origin, lang)
-        folium.Marker(
-            location=[route_info.origin.lat, route_info.origin.lng],
-            popup=origin_popup,
-            icon=origin_icon,
-            tooltip=f"Origin: {route_info.origin.name_en if lang == 'en' else route_info.origin.name_fa}"
-        ).add_to(m)
+        self._add_marker(
+            route_layer,
+            [route_info.origin.lat, route_info.origin.lng],
+            origin_popup,
+            f"Origin: {route_info.origin.name_en if lang == 'en' else route_info.origin.name_fa}",
+            origin_icon
+        )
         
         # Add destination marker
-        dest_icon = folium.Icon(color='red', icon='flag-checkered', prefix='fa')
+        dest_icon = self._add_shared_icon(route_layer, _DESTINATION_ICON_KW)
         dest_popup = self._create_point_popup(route_info.destination, lang)
-        folium.Marker(
-            location=[route_info.destination.lat, route_info.destination.lng],
-            popup=dest_popup,
-            icon=dest_icon,
-            tooltip=f"Destination: {route_info.destination.name_en if lang == 'en' else route_info.destination.name_fa}"
-        ).add_to(m)
+        self._add_marker(
+            route_layer,
+            [route_info.destination.lat, route_info.destination.lng],
+            dest_popup,
+            f"Destination: {route_info.destination.name_en if lang == 'en' else route_info.destination.name_fa}",
+            dest_icon
+        )
         
         # Add waypoints
+        if route_info.waypoints:
+            waypoint_icon = self._add_shared_icon(route_layer, _WAYPOINT_ICON_KW)
         for i, waypoint in enumerate(route_info.waypoints):
-            waypoint_icon = folium.Icon(color='blue', icon='map-marker', prefix='fa')
             waypoint_popup = self._create_point_popup(waypoint, lang)
-            folium.Marker(
-                location=[waypoint.lat, waypoint.lng],
-                popup=waypoint_popup,
-                icon=waypoint_icon,
-                tooltip=f"Waypoint {i+1}: {waypoint.name_en if lang == 'en' else waypoint.name_fa}"
-            ).add_to(m)
+            self._add_marker(
+                route_layer,
+                [waypoint.lat, waypoint.lng],
+                waypoint_popup,
+                f"Waypoint {i+1}: {waypoint.name_en if lang == 'en' else waypoint.name_fa}",
+                waypoint_icon
+            )
         
         # Add route line
         route_coords = self._get_route_coordinates(route_info)
@@ -287,62 +536,58 @@ class IranMapService:
                 color='blue',
                 weight=4,
                 opacity=0.8
-            ).add_to(m)
+            ).add_to(route_layer)
         
         # Add cultural highlights
+        if route_info.cultural_highlights:
+            highlight_icon = self._add_shared_icon(route_layer, _HIGHLIGHT_ICON_KW)
         for highlight in route_info.cultural_highlights:
-            highlight_icon = folium.Icon(color='purple', icon='star', prefix='fa')
             highlight_popup = self._create_point_popup(highlight, lang)
-            folium.Marker(
-                location=[highlight.lat, highlight.lng],
-                popup=highlight_popup,
-                icon=highlight_icon,
-                tooltip=f"Cultural: {highlight.name_en if lang == 'en' else highlight.name_fa}"
-            ).add_to(m)
+            self._add_marker(
+                route_layer,
+                [highlight.lat, highlight.lng],
+                highlight_popup,
+                f"Cultural: {highlight.name_en if lang == 'en' else highlight.name_fa}",
+                highlight_icon
+            )
         
         return m
     
+    def _add_shared_icon(self, layer: folium.FeatureGroup, icon_kw: Mapping[str, str]) -> folium.Icon:
+        """Declare an icon once on a layer so several markers can reuse it"""
+        return folium.Icon(**icon_kw).add_to(layer)
+    
+    def _add_marker(self, layer: folium.FeatureGroup, location: List[float], popup: str, tooltip: str, icon: folium.Icon):
+        """Add a marker that points at an already declared shared icon"""
+        # Attaching the icon through SetIcon (instead of icon=) keeps folium
+        # from re-emitting the icon definition for every marker
+        marker = folium.Marker(location=location, popup=popup, tooltip=tooltip).add_to(layer)
+        marker.add_child(folium.Marker.SetIcon(marker=marker, icon=icon))
+    
     def _create_point_popup(self, point: MapPoint, lang: str) -> str:
         """Create HTML popup for a map point"""
-        if lang == 'fa':
-            return f"""
-            <div style="width: 200px;">
-                <h4>{point.name_fa}</h4>
-                <p><strong>دسته‌بندی:</strong> {point.category}</p>
-                <p><strong>امتیاز فرهنگی:</strong> {point.cultural_significance:.1f}/5.0</p>
-                <p><strong>امتیاز کلی:</strong> {point.rating:.1f}/5.0</p>
-                <p>{point.description_fa}</p>
-            </div>
-            """
-        else:
-            return f"""
-            <div style="width: 200px;">
-                <h4>{point.name_en}</h4>
-                <p><strong>Category:</strong> {point.category}</p>
-                <p><strong>Cultural Significance:</strong> {point.cultural_significance:.1f}/5.0</p>
-                <p><strong>Rating:</strong> {point.rating:.1f}/5.0</p>
-                <p>{point.description_en}</p>
-            </div>
-            """
+        return point.popup_fa if lang == 'fa' else point.popup_en
     
     def _get_route_coordinates(self, route_info: RouteInfo) -> List[List[float]]:
         """Get coordinates for the route line"""
-        coords = []
-        
-        # Add origin
-        coords.append([route_info.origin.lat, route_info.origin.lng])
-        
-        # Add waypoints
-        for waypoint in route_info.waypoints:
-            coords.append([waypoint.lat, waypoint.lng])
-        
-        # Add destination
-        coords.append([route_info.destination.lat, route_info.destination.lng])
-        
-        return coords
+        # Origin, waypoints, then destination
+        return [
+            [point.lat, point.lng]
+            for point in (route_info.origin, *route_info.waypoints, route_info.destination)
+        ]
     
     def get_route_from_osrm(self, origin: List[float], destination: List[float], waypoints: Optional[List[List[float]]] = None) -> Dict[str, Any]:
         """Get route from OSRM API"""
+        cache_key = tuple(
+            (round(point[0], 4), round(point[1], 4))
+            for point in [origin, *(waypoints or []), destination]
+        )
+        # Callers get deep copies so they cannot alter the cached entry
+        cached = self._route_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached[0])
+        stale = self._route_cache.peek(cache_key)
+        
         try:
             # Build coordinates string
             coords = f"{origin[1]},{origin[0]}"
@@ -359,54 +604,61 @@ class IranMapService:
                 'annotations': 'true'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._http.get(url, params=params, headers=self._revalidation_headers(stale), timeout=10)
+            if response.status_code == 304 and stale is not None:
+                self._route_cache.set(cache_key, stale)
+                return copy.deepcopy(stale[0])
             response.raise_for_status()
             
-            data = response.json()
+            data = _json_loads(response.content)
             
             if data['code'] == 'Ok' and data['routes']:
                 route = data['routes'][0]
-                return {
+                result = {
                     'distance': route['distance'] / 1000,  # Convert to km
                     'duration': route['duration'] / 3600,  # Convert to hours
                     'geometry': route['geometry'],
                     'legs': route['legs']
                 }
+                self._route_cache.set(cache_key, (result, response.headers.get('ETag')))
+                return copy.deepcopy(result)
             
             return None
             
-        except Exception as e:
-            logger.error(f"Error getting route from OSRM: {e}")
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.error("Error getting route from OSRM: %s", e)
             return None
     
     def find_nearby_places(self, lat: float, lng: float, radius: int = 5000, categories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Find nearby places using Overpass API"""
+        if categories is None:
+            categories = ['tourism', 'historic', 'religious', 'restaurant', 'hotel']
+        
+        cache_key = (round(lat, 3), round(lng, 3), radius, tuple(sorted(set(categories))))
+        cached = self._places_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached[0])
+        stale = self._places_cache.peek(cache_key)
+        
         try:
             # Build Overpass query
-            if categories is None:
-                categories = ['tourism', 'historic', 'religious', 'restaurant', 'hotel']
-            
-            query_parts = []
-            for category in categories:
-                query_parts.append(f'node["tourism"](around:{radius},{lat},{lng});')
-                query_parts.append(f'node["historic"](around:{radius},{lat},{lng});')
-                query_parts.append(f'node["amenity"="restaurant"](around:{radius},{lat},{lng});')
-                query_parts.append(f'node["tourism"="hotel"](around:{radius},{lat},{lng});')
-            
-            query = f"""
-            [out:json][timeout:25];
-            (
-                {''.join(query_parts)}
-            );
-            out body;
-            >;
-            out skel qt;
-            """
+            # One clause per unique known category
+            body = '\n'.join(
+                _OVERPASS_CLAUSE_TEMPLATE.format(
+                    selector=_OVERPASS_SELECTORS[category], radius=radius, lat=lat, lng=lng
+                )
+                for category in dict.fromkeys(categories)
+                if category in _OVERPASS_SELECTORS
+            )
+            query = _OVERPASS_QUERY_TEMPLATE.format(body=body)
             
-            response = requests.post(self.overpass_base_url, data=query, timeout=30)
+            response = self._http.post(self.overpass_base_url, data=query, headers=self._revalidation_headers(stale), timeout=30)
+            if response.status_code == 304 and stale is not None:
+                self._places_cache.set(cache_key, stale)
+                return copy.deepcopy(stale[0])
             response.raise_for_status()
             
-            data = response.json()
+            data = _json_loads(response.content)
             
             places = []
             for element in data.get('elements', []):
@@ -421,58 +673,53 @@ class IranMapService:
                     }
                     places.append(place)
             
-            return places
+            self._places_cache.set(cache_key, (places, response.headers.get('ETag')))
+            return copy.deepcopy(places)
             
-        except Exception as e:
-            logger.error(f"Error finding nearby places: {e}")
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.error("Error finding nearby places: %s", e)
             return []
     
+    def _revalidation_headers(self, stale: Optional[Tuple[Any, Optional[str]]]) -> Optional[Dict[str, str]]:
+        """Conditional request headers for an expired cache entry"""
+        if stale is not None and stale[1]:
+            return {'If-None-Match': stale[1]}
+        return None
+    
     def _categorize_place(self, tags: Dict[str, str]) -> str:
         """Categorize a place based on its tags"""
-        if 'historic' in tags:
-            return 'historical'
-        elif 'tourism' in tags:
-            return 'tourist'
-        elif 'amenity' in tags and tags['amenity'] == 'restaurant':
-            return 'restaurant'
-        elif 'tourism' in tags and tags['tourism'] == 'hotel':
-            return 'hotel'
-        elif 'religion' in tags:
-            return 'religious'
-        else:
+        if _CATEGORY_TAG_KEYS.isdisjoint(tags):
             return 'other'
+        for rule, category in _TAG_CATEGORY_RULES:
+            if isinstance(rule, tuple):
+                if tags.get(rule[0]) == rule[1]:
+                    return category
+            elif rule in tags:
+                return category
+        return 'other'
     
     def create_cultural_tour_map(self, cities: List[str], lang: str = 'en') -> folium.Map:
         """Create a map for a cultural tour"""
         # Create base map
         m = self.create_iran_map()
         
-        # Add cultural tour route
-        tour_points = []
-        for city_name in cities:
-            city_data = self._get_city_data(city_name)
-            if city_data:
-                tour_points.append(MapPoint(
-                    lat=city_data['lat'],
-                    lng=city_data['lng'],
-                    name_fa=city_data['name_fa'],
-                    name_en=city_data['name_en'],
-                    category='cultural_tour',
-                    cultural_significance=city_data['cultural_significance'],
-                    description_fa=city_data['description_fa'],
-                    description_en=city_data['description_en'],
-                    photos=city_data.get('photos', []),
-                    rating=city_data['rating']
-                ))
+        # Add cultural tour route (unknown cities are skipped)
+        tour_points = [point for point in map(_CITY_DB.get, cities) if point is not None]
         
         # Create route info
         if len(tour_points) >= 2:
+            # One OSRM request covers every leg of the tour
+            route = self.get_route_from_osrm(
+                [tour_points[0].lat, tour_points[0].lng],
+                [tour_points[-1].lat, tour_points[-1].lng],
+                [[point.lat, point.lng] for point in tour_points[1:-1]]
+            )
             route_info = RouteInfo(
                 origin=tour_points[0],
                 destination=tour_points[-1],
                 waypoints=tour_points[1:-1],
-                distance_km=0,  # Will be calculated
-                duration_hours=0,  # Will be calculated
+                distance_km=route['distance'] if route else 0,
+                duration_hours=route['duration'] if route else 0,
                 route_type='cultural_tour',
                 cultural_highlights=tour_points
             )
@@ -482,48 +729,33 @@ class IranMapService:
         
         return m
     
-    def _get_city_data(self, city_name: str) -> Optional[Dict[str, Any]]:
-        """Get city data by name"""
-        city_database = {
-            'تهران': {
-                'lat': 35.6892, 'lng': 51.3890,
-                'name_fa': 'تهران', 'name_en': 'Tehran',
-                'cultural_significance': 4.2,
-                'description_fa': 'پایتخت ایران و مرکز سیاسی و اقتصادی',
-                'description_en': 'Capital of Iran and political/economic center',
-                'rating': 4.2,
-                'photos': []
-            },
-            'اصفهان': {
-                'lat': 32.6546, 'lng': 51.6680,
-                'name_fa': 'اصفهان', 'name_en': 'Isfahan',
-                'cultural_significance': 4.8,
-                'description_fa': 'شهر نصف جهان با معماری تاریخی باشکوه',
-                'description_en': 'Half the World city with magnificent historical architecture',
-                'rating': 4.8,
-                'photos': []
-            },
-            'شیراز': {
-                'lat': 29.5916, 'lng': 52.5836,
-                'name_fa': 'شیراز', 'name_en': 'Shiraz',
-                'cultural_significance': 4.7,
-                'description_fa': 'شهر شعر و ادب و باغ‌های زیبا',
-                'description_en': 'City of poetry and beautiful gardens',
-                'rating': 4.7,
-                'photos': []
-            }
-        }
-        return city_database.get(city_name)
+    def _get_city_data(self, city_name: str) -> Optional[MapPoint]:
+        """Get city map point by name"""
+        return _CITY_DB.get(city_name)
     
-    def export_map_to_html(self, m: folium.Map, filename: str) -> str:
-        """Export map to HTML file"""
+    def export_map_to_html(self, m: folium.Map, filename: str, compress: bool = False) -> str:
+        """Export map to HTML file, optionally gzip-compressed"""
         try:
-            m.save(filename)
+            html = m.get_root().render()
+            if compress:
+                filename = f"{filename}.gz"
+                with gzip.open(filename, 'wt', compresslevel=6, encoding='utf-8') as f:
+                    f.write(html)
+            else:
+                Path(filename).write_text(html, encoding='utf-8')
             return f"Map exported to {filename}"
-        except Exception as e:
-            logger.error(f"Error exporting map: {e}")
+        except OSError as e:
+            logger.error("Error exporting map: %s", e)
             return f"Error exporting map: {e}"
     
+    def _sites_in_bbox(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> List[Dict[str, Any]]:
+        """Return UNESCO sites inside a bounding box"""
+        mask = (
+            (_UNESCO_LATS >= lat_min) & (_UNESCO_LATS <= lat_max) &
+            (_UNESCO_LNGS >= lng_min) & (_UNESCO_LNGS <= lng_max)
+        )
+        return [self.unesco_sites[i] for i in np.flatnonzero(mask)]
+    
     def create_offline_map_data(self, region: str) -> Dict[str, Any]:
         """Create offline map data for a region"""
         offline_data = {
@@ -535,10 +767,8 @@ class IranMapService:
         }
         
         # Add cultural sites for the region
-        if region == 'central_iran':
-            offline_data['cultural_sites'] = [
-                site for site in self.unesco_sites 
-                if 32.0 <= site['lat'] <= 36.0 and 50.0 <= site['lng'] <= 53.0
-            ]
+        bbox = _REGION_BBOXES.get(region)
+        if bbox:
+            offline_data['cultural_sites'] = self._sites_in_bbox(*bbox)
         
         return offline_data 
\ No newline at end of file
@@ -1,30 +1,377 @@
+import asyncio
 import folium
+import numpy as np
 import requests
 import json
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 from app.core.config import settings
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    # Fallback to the standard library decoder
+    _json_loads = json.loads
+
+try:
+    from pyproj import Geod
+    _GEOD = Geod(ellps='WGS84')
+except ImportError:
+    # Fallback to geopy for ellipsoidal distances
+    _GEOD = None
+
+# مختصات شهرهای شناخته‌شده (بدون نیاز به درخواست Nominatim)
+KNOWN_CITY_COORDS = {
+    'تهران': (35.6892, 51.3890),
+    'اصفهان': (32.6546, 51.6680),
+    'شیراز': (29.5916, 52.5836),
+    'تبریز': (38.0800, 46.2919),
+    'مشهد': (36.2605, 59.6168),
+    'یزد': (31.8974, 54.3569),
+    'کاشان': (33.9850, 51.4100),
+    'قم': (34.6416, 50.8746),
+    'کرج': (35.8400, 50.9391),
+    'اهواز': (31.3183, 48.6706)
+}
+
+GEOCODE_CACHE_SIZE = 1024
+# نام‌هایی که ژئوکد نشدند تا این مدت (ثانیه) دوباره از Nominatim پرسیده نمی‌شوند
+GEOCODE_NEGATIVE_TTL = 300
+GEOCODE_STORE_FILE = 'geocode_cache.db'
+POLYLINE_CACHE_SIZE = 512
+ROUTE_MAP_CACHE_SIZE = 128
+OVERPASS_CACHE_SIZE = 64
+OVERPASS_CACHE_TTL = 3600
+# سیاست استفاده Nominatim عمومی: حداکثر یک درخواست در ثانیه
+GEOCODE_MIN_INTERVAL = 1.0
+
+EARTH_RADIUS_KM = 6371.0
+
+def _haversine_km(route_coords) -> np.ndarray:
+    """فاصله هر دو نقطه متوالی مسیر (کیلومتر) به صورت برداری"""
+    points = np.deg2rad(np.asarray(route_coords, dtype=np.float64))
+    lat1, lng1 = points[:-1, 0], points[:-1, 1]
+    lat2, lng2 = points[1:, 0], points[1:, 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+# Sample attractions data for major cities
+_ATTRACTIONS = {
+    'اصفهان': [
+        {
+            'name': 'میدان امام',
+            'category': 'تاریخی',
+            'lat': 32.6577,
+            'lng': 51.6775,
+            'rating': 4.8,
+            'description': 'میدان تاریخی امام خمینی'
+        },
+        {
+            'name': 'مسجد شیخ لطف‌الله',
+            'category': 'مذهبی',
+            'lat': 32.6578,
+            'lng': 51.6776,
+            'rating': 4.7,
+            'description': 'مسجد تاریخی شیخ لطف‌الله'
+        },
+        {
+            'name': 'کاخ چهلستون',
+            'category': 'تاریخی',
+            'lat': 32.6580,
+            'lng': 51.6778,
+            'rating': 4.6,
+            'description': 'کاخ تاریخی چهلستون'
+        }
+    ],
+    'شیراز': [
+        {
+            'name': 'تخت جمشید',
+            'category': 'تاریخی',
+            'lat': 29.9354,
+            'lng': 52.8916,
+            'rating': 4.9,
+            'description': 'مجموعه تاریخی تخت جمشید'
+        },
+        {
+            'name': 'مسجد نصیرالملک',
+            'category': 'مذهبی',
+            'lat': 29.6083,
+            'lng': 52.5432,
+            'rating': 4.7,
+            'description': 'مسجد زیبای نصیرالملک'
+        },
+        {
+            'name': 'باغ ارم',
+            'category': 'طبیعی',
+            'lat': 29.6085,
+            'lng': 52.5435,
+            'rating': 4.5,
+            'description': 'باغ تاریخی ارم'
+        }
+    ],
+    'تهران': [
+        {
+            'name': 'برج آزادی',
+            'category': 'تاریخی',
+            'lat': 35.6994,
+            'lng': 51.3375,
+            'rating': 4.3,
+            'description': 'برج آزادی تهران'
+        },
+        {
+            'name': 'کاخ گلستان',
+            'category': 'تاریخی',
+            'lat': 35.6804,
+            'lng': 51.4203,
+            'rating': 4.4,
+            'description': 'کاخ تاریخی گلستان'
+        },
+        {
+            'name': 'موزه ملی ایران',
+            'category': 'فرهنگی',
+            'lat': 35.6892,
+            'lng': 51.3890,
+            'rating': 4.2,
+            'description': 'موزه ملی ایران'
+        }
+    ],
+    'مشهد': [
+        {
+            'name': 'حرم امام رضا',
+            'category': 'مذهبی',
+            'lat': 36.2605,
+            'lng': 59.6168,
+            'rating': 4.9,
+            'description': 'حرم مطهر امام رضا'
+        },
+        {
+            'name': 'گنبد سبز',
+            'category': 'تاریخی',
+            'lat': 36.2607,
+            'lng': 59.6170,
+            'rating': 4.1,
+            'description': 'گنبد سبز مشهد'
+        }
+    ],
+    'یزد': [
+        {
+            'name': 'مسجد جامع یزد',
+            'category': 'مذهبی',
+            'lat': 31.8974,
+            'lng': 54.3569,
+            'rating': 4.6,
+            'description': 'مسجد جامع تاریخی یزد'
+        },
+        {
+            'name': 'برج خاموشان',
+            'category': 'تاریخی',
+            'lat': 31.8976,
+            'lng': 54.3571,
+            'rating': 4.3,
+            'description': 'برج خاموشان یزد'
+        }
+    ],
+    'کاشان': [
+        {
+            'name': 'باغ فین',
+            'category': 'طبیعی',
+            'lat': 33.9850,
+            'lng': 51.4100,
+            'rating': 4.4,
+            'description': 'باغ تاریخی فین کاشان'
+        },
+        {
+            'name': 'خانه بروجردی‌ها',
+            'category': 'تاریخی',
+            'lat': 33.9852,
+            'lng': 51.4102,
+            'rating': 4.2,
+            'description': 'خانه تاریخی بروجردی‌ها'
+        }
+    ]
+}
+
+# Attractions along the way between two cities (either direction)
+_ROUTE_EDGES = {
+    frozenset({'تهران', 'اصفهان'}): _ATTRACTIONS['کاشان'],
+    frozenset({'اصفهان', 'شیراز'}): [
+        {
+            'name': 'پاسارگاد',
+            'category': 'تاریخی',
+            'lat': 30.1956,
+            'lng': 53.1678,
+            'rating': 4.5,
+            'description': 'آرامگاه کوروش کبیر'
+        }
+    ]
+}
+
+# All known attractions (each once) with their coordinates packed into an
+# (N, 2) [lat, lng] array for spatial queries
+_ALL_ATTRACTIONS = tuple({
+    attraction['name']: attraction
+    for attractions in (*_ATTRACTIONS.values(), *_ROUTE_EDGES.values())
+    for attraction in attractions
+}.values())
+_ATTRACTION_COORDS = np.array(
+    [[attraction['lat'], attraction['lng']] for attraction in _ALL_ATTRACTIONS],
+    dtype=np.float64
+)
+
+KM_PER_DEGREE_LAT = 110.574
+
+# میانگین سرعت هر وسیله نقلیه (km/h)
+_SPEEDS_KMH = {
+    'car': 80,
+    'train': 120,
+    'bus': 60,
+    'bicycle': 20,
+    'walking': 5
+}
+
+def _point_feature(coords, popup: str, color: str, icon: str) -> Dict:
+    """یک نقطه GeoJSON (ترتیب [lng, lat]) برای لایه نشانگرهای نقشه"""
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [coords[1], coords[0]]},
+        'properties': {'popup': popup, 'color': color, 'icon': icon}
+    }
+
+def _marker_style(feature: Dict) -> Dict:
+    """رنگ و آیکون هر نشانگر (در گزینه‌های AwesomeMarkers ادغام می‌شود)"""
+    return {
+        'markerColor': feature['properties']['color'],
+        'icon': feature['properties']['icon']
+    }
+
 class MapService:
     def __init__(self):
         self.geolocator = Nominatim(user_agent="ai_travel_agent")
         self.base_url = settings.openstreetmap_url
+        # کش نتایج ژئوکد، با شهرهای شناخته‌شده از پیش پر شده
+        self._geo_cache: Dict[str, Tuple[float, float]] = dict(KNOWN_CITY_COORDS)
+        # نام‌های ناموفق: زمان انقضا
+        self._geo_misses: Dict[str, float] = {}
+        # ذخیره پایدار نتایج Nominatim تا پس از راه‌اندازی مجدد دوباره پرسیده نشوند
+        self._geo_store_lock = threading.Lock()
+        self._geo_store = self._open_geo_store()
+        # One Nominatim request at a time, spaced GEOCODE_MIN_INTERVAL apart
+        self._nominatim_lock = threading.Lock()
+        self._nominatim_last_call = float('-inf')
+        # Pooled HTTP session for OSRM/Overpass and a worker pool that keeps
+        # blocking network calls off the event loop
+        self._http = requests.Session()
+        self._http.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'ai_travel_agent/1.0'
+        })
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='map')
+        # مسیرهای OSRM بر اساس (مبدا، مقصد)
+        self._polyline_cache: Dict[Tuple[str, str], Tuple[Tuple[float, float], ...]] = {}
+        self._polyline_lock = threading.Lock()
+        # HTML نقشه‌های ساخته‌شده بر اساس هش (مسیر، جاذبه‌ها)
+        self._route_map_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._route_map_lock = threading.Lock()
+        # عناصر پاسخ Overpass بر اساس متن کوئری: (زمان انقضا، عناصر)
+        self._overpass_cache: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._overpass_lock = threading.Lock()
         
+    def _nominatim(self, method, *args):
+        """فراخوانی Nominatim با رعایت محدودیت یک درخواست در ثانیه"""
+        with self._nominatim_lock:
+            wait = self._nominatim_last_call + GEOCODE_MIN_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return method(*args)
+            finally:
+                self._nominatim_last_call = time.monotonic()
+    
+    def _open_geo_store(self) -> Optional[sqlite3.Connection]:
+        """باز کردن فایل SQLite نتایج ژئوکد و بارگذاری آن در کش"""
+        try:
+            os.makedirs(settings.data_dir, exist_ok=True)
+            store = sqlite3.connect(
+                os.path.join(settings.data_dir, GEOCODE_STORE_FILE),
+                check_same_thread=False
+            )
+            store.execute(
+                "CREATE TABLE IF NOT EXISTS geocode (name TEXT PRIMARY KEY, lat REAL NOT NULL, lng REAL NOT NULL)"
+            )
+            rows = store.execute("SELECT name, lat, lng FROM geocode LIMIT ?", (GEOCODE_CACHE_SIZE,))
+            for name, lat, lng in rows:
+                self._geo_cache.setdefault(name, (lat, lng))
+            return store
+        except sqlite3.Error as e:
+            print(f"Error opening geocode store: {e}")
+            return None
+    
+    def _store_geocode(self, key: str, coords: Tuple[float, float]):
+        """ثبت نتیجه موفق ژئوکد در فایل پایدار"""
+        if self._geo_store is None:
+            return
+        try:
+            with self._geo_store_lock, self._geo_store:
+                self._geo_store.execute(
+                    "INSERT OR REPLACE INTO geocode (name, lat, lng) VALUES (?, ?, ?)",
+                    (key, coords[0], coords[1])
+                )
+        except sqlite3.Error as e:
+            print(f"Error saving geocode for {key}: {e}")
+    
     def geocode_city(self, city_name: str) -> Optional[Tuple[float, float]]:
         """تبدیل نام شهر به مختصات جغرافیایی"""
+        coords = self._geo_cache.get(city_name)
+        if coords is not None:
+            return coords
+        
+        key = city_name.strip().lower()
+        coords = self._geo_cache.get(key)
+        if coords is not None:
+            return coords
+        if self._geo_misses.get(key, 0.0) > time.monotonic():
+            return None
+        
         try:
-            location = self.geolocator.geocode(city_name)
+            location = self._nominatim(self.geolocator.geocode, key)
             if location:
-                return (location.latitude, location.longitude)
+                coords = (location.latitude, location.longitude)
+                if len(self._geo_cache) < GEOCODE_CACHE_SIZE:
+                    self._geo_cache[key] = coords
+                self._geo_misses.pop(key, None)
+                self._store_geocode(key, coords)
+                return coords
         except Exception as e:
             print(f"Error geocoding {city_name}: {e}")
+        # Each miss costs a rate-limited Nominatim slot, so unresolved names
+        # are not retried until the negative entry expires
+        self._geo_misses[key] = time.monotonic() + GEOCODE_NEGATIVE_TTL
         return None
     
+    def geocode_cities(self, city_names: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+        """تبدیل چند نام شهر به مختصات (کش‌شده‌ها بدون درخواست شبکه)"""
+        names = list(dict.fromkeys(city_names))
+        coords = {name: self._geo_cache.get(name) for name in names}
+        # Nominatim allows one request per second, so misses are resolved in turn
+        for name, value in coords.items():
+            if value is None:
+                coords[name] = self.geocode_city(name)
+        
+        return coords
+    
     def reverse_geocode(self, lat: float, lng: float) -> Optional[str]:
         """تبدیل مختصات جغرافیایی به نام مکان"""
         try:
-            location = self.geolocator.reverse(f"{lat}, {lng}")
+            location = self._nominatim(self.geolocator.reverse, f"{lat}, {lng}")
             if location:
                 return location.address
         except Exception as e:
@@ -33,15 +380,32 @@ class MapService:
     
     def create_route_map(self, route: Dict, attractions: List[Dict] = None) -> str:
         """ایجاد نقشه مسیر با Folium"""
+        cache_key = hashlib.blake2b(
+            json.dumps([route, attractions], sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'),
+            digest_size=16
+        ).digest()
+        with self._route_map_lock:
+            html = self._route_map_cache.get(cache_key)
+            if html is not None:
+                self._route_map_cache.move_to_end(cache_key)
+                return html
+        
+        # Find coordinates for route points (each city geocoded once, in parallel)
+        segments = route.get('segments', [])
+        city_coords = self.geocode_cities(
+            [city for segment in segments for city in (segment['origin'], segment['destination'])]
+        )
         
-        # Find coordinates for route points
         route_coords = []
-        for segment in route.get('segments', []):
-            origin_coords = self.geocode_city(segment['origin'])
-            dest_coords = self.geocode_city(segment['destination'])
+        features = []
+        for segment in segments:
+            origin_coords = city_coords[segment['origin']]
+            dest_coords = city_coords[segment['destination']]
             
             if origin_coords and dest_coords:
                 route_coords.extend([origin_coords, dest_coords])
+                features.append(_point_feature(origin_coords, f"مبدا: {segment['origin']}", 'green', 'info-sign'))
+                features.append(_point_feature(dest_coords, f"مقصد: {segment['destination']}", 'red', 'info-sign'))
         
         if not route_coords:
             return None
@@ -66,199 +430,87 @@ class MapService:
                 opacity=0.8
             ).add_to(m)
         
-        # Add markers for cities
-        for i, coord in enumerate(route_coords):
-            if i % 2 == 0:  # Origin cities
-                folium.Marker(
-                    coord,
-                    popup=f"مبدا: {route['segments'][i//2]['origin']}",
-                    icon=folium.Icon(color='green', icon='info-sign')
-                ).add_to(m)
-            else:  # Destination cities
-                folium.Marker(
-                    coord,
-                    popup=f"مقصد: {route['segments'][i//2]['destination']}",
-                    icon=folium.Icon(color='red', icon='info-sign')
-                ).add_to(m)
-        
-        # Add attraction markers
+        # Add city and attraction markers as a single GeoJSON layer
         if attractions:
             for attraction in attractions:
-                folium.Marker(
-                    [attraction['lat'], attraction['lng']],
-                    popup=f"{attraction['name']}<br>امتیاز: {attraction.get('rating', 'N/A')}",
-                    icon=folium.Icon(color='orange', icon='star')
-                ).add_to(m)
+                features.append(_point_feature(
+                    (attraction['lat'], attraction['lng']),
+                    f"{attraction['name']}<br>امتیاز: {attraction.get('rating', 'N/A')}",
+                    'orange',
+                    'star'
+                ))
+        
+        for feature_id, feature in enumerate(features):
+            feature['id'] = feature_id
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': features},
+            marker=folium.Marker(icon=folium.Icon()),
+            style_function=_marker_style,
+            popup=folium.GeoJsonPopup(fields=['popup'], labels=False)
+        ).add_to(m)
         
         # Save map to HTML string
-        return m._repr_html_()
+        html = m._repr_html_()
+        with self._route_map_lock:
+            self._route_map_cache[cache_key] = html
+            if len(self._route_map_cache) > ROUTE_MAP_CACHE_SIZE:
+                self._route_map_cache.popitem(last=False)
+        return html
     
     def get_attractions_for_route(self, origin: str, destination: str) -> List[Dict]:
         """دریافت جاذبه‌های مسیر"""
-        # Sample attractions data for major cities
-        attractions_data = {
-            'اصفهان': [
-                {
-                    'name': 'میدان امام',
-                    'category': 'تاریخی',
-                    'lat': 32.6577,
-                    'lng': 51.6775,
-                    'rating': 4.8,
-                    'description': 'میدان تاریخی امام خمینی'
-                },
-                {
-                    'name': 'مسجد شیخ لطف‌الله',
-                    'category': 'مذهبی',
-                    'lat': 32.6578,
-                    'lng': 51.6776,
-                    'rating': 4.7,
-                    'description': 'مسجد تاریخی شیخ لطف‌الله'
-                },
-                {
-                    'name': 'کاخ چهلستون',
-                    'category': 'تاریخی',
-                    'lat': 32.6580,
-                    'lng': 51.6778,
-                    'rating': 4.6,
-                    'description': 'کاخ تاریخی چهلستون'
-                }
-            ],
-            'شیراز': [
-                {
-                    'name': 'تخت جمشید',
-                    'category': 'تاریخی',
-                    'lat': 29.9354,
-                    'lng': 52.8916,
-                    'rating': 4.9,
-                    'description': 'مجموعه تاریخی تخت جمشید'
-                },
-                {
-                    'name': 'مسجد نصیرالملک',
-                    'category': 'مذهبی',
-                    'lat': 29.6083,
-                    'lng': 52.5432,
-                    'rating': 4.7,
-                    'description': 'مسجد زیبای نصیرالملک'
-                },
-                {
-                    'name': 'باغ ارم',
-                    'category': 'طبیعی',
-                    'lat': 29.6085,
-                    'lng': 52.5435,
-                    'rating': 4.5,
-                    'description': 'باغ تاریخی ارم'
-                }
-            ],
-            'تهران': [
-                {
-                    'name': 'برج آزادی',
-                    'category': 'تاریخی',
-                    'lat': 35.6994,
-                    'lng': 51.3375,
-                    'rating': 4.3,
-                    'description': 'برج آزادی تهران'
-                },
-                {
-                    'name': 'کاخ گلستان',
-                    'category': 'تاریخی',
-                    'lat': 35.6804,
-                    'lng': 51.4203,
-                    'rating': 4.4,
-                    'description': 'کاخ تاریخی گلستان'
-                },
-                {
-                    'name': 'موزه ملی ایران',
-                    'category': 'فرهنگی',
-                    'lat': 35.6892,
-                    'lng': 51.3890,
-                    'rating': 4.2,
-                    'description': 'موزه ملی ایران'
-                }
-            ],
-            'مشهد': [
-                {
-                    'name': 'حرم امام رضا',
-                    'category': 'مذهبی',
-                    'lat': 36.2605,
-                    'lng': 59.6168,
-                    'rating': 4.9,
-                    'description': 'حرم مطهر امام رضا'
-                },
-                {
-                    'name': 'گنبد سبز',
-                    'category': 'تاریخی',
-                    'lat': 36.2607,
-                    'lng': 59.6170,
-                    'rating': 4.1,
-                    'description': 'گنبد سبز مشهد'
-                }
-            ],
-            'یزد': [
-                {
-                    'name': 'مسجد جامع یزد',
-                    'category': 'مذهبی',
-                    'lat': 31.8974,
-                    'lng': 54.3569,
-                    'rating': 4.6,
-                    'description': 'مسجد جامع تاریخی یزد'
-                },
-                {
-                    'name': 'برج خاموشان',
-                    'category': 'تاریخی',
-                    'lat': 31.8976,
-                    'lng': 54.3571,
-                    'rating': 4.3,
-                    'description': 'برج خاموشان یزد'
-                }
-            ],
-            'کاشان': [
-                {
-                    'name': 'باغ فین',
-                    'category': 'طبیعی',
-                    'lat': 33.9850,
-                    'lng': 51.4100,
-                    'rating': 4.4,
-                    'description': 'باغ تاریخی فین کاشان'
-                },
-                {
-                    'name': 'خانه بروجردی‌ها',
-                    'category': 'تاریخی',
-                    'lat': 33.9852,
-                    'lng': 51.4102,
-                    'rating': 4.2,
-                    'description': 'خانه تاریخی بروجردی‌ها'
-                }
-            ]
-        }
-        
-        # Get attractions for both origin and destination
-        route_attractions = []
+        # Attractions of origin and destination, then along the route
+        route_attractions = (
+            _ATTRACTIONS.get(origin, [])
+            + _ATTRACTIONS.get(destination, [])
+            + _ROUTE_EDGES.get(frozenset({origin, destination}), [])
+        )
         
-        if origin in attractions_data:
-            route_attractions.extend(attractions_data[origin])
+        # Copies, so callers can annotate results without touching the shared table
+        return [dict(attraction) for attraction in route_attractions[:5]]  # Return top 5 attractions
+    
+    def attractions_near_polyline(self, polyline: List[Tuple[float, float]], radius_km: float = 20.0) -> List[Dict]:
+        """جاذبه‌های نزدیک به یک مسیر (در فاصله radius_km از خط مسیر)"""
+        line = np.asarray(polyline, dtype=np.float64).reshape(-1, 2)
+        if not len(line) or not len(_ALL_ATTRACTIONS):
+            return []
         
-        if destination in attractions_data:
-            route_attractions.extend(attractions_data[destination])
+        # Cheap bounding-box prefilter (route MBR grown by the radius)
+        pad_lat = radius_km / KM_PER_DEGREE_LAT
+        pad_lng = pad_lat / max(np.cos(np.deg2rad(np.abs(line[:, 0]).max())), 0.01)
+        lat_min, lng_min = line.min(axis=0) - (pad_lat, pad_lng)
+        lat_max, lng_max = line.max(axis=0) + (pad_lat, pad_lng)
+        lats, lngs = _ATTRACTION_COORDS[:, 0], _ATTRACTION_COORDS[:, 1]
+        candidates = np.flatnonzero(
+            (lats >= lat_min) & (lats <= lat_max) & (lngs >= lng_min) & (lngs <= lng_max)
+        )
+        if not candidates.size:
+            return []
         
-        # Add some attractions along the route
-        if origin == 'تهران' and destination == 'اصفهان':
-            route_attractions.extend(attractions_data.get('کاشان', []))
-        elif origin == 'اصفهان' and destination == 'شیراز':
-            route_attractions.extend([
-                {
-                    'name': 'پاسارگاد',
-                    'category': 'تاریخی',
-                    'lat': 30.1956,
-                    'lng': 53.1678,
-                    'rating': 4.5,
-                    'description': 'آرامگاه کوروش کبیر'
-                }
-            ])
+        # Exact point-to-segment distance on a local equirectangular projection (km)
+        scale = np.array([KM_PER_DEGREE_LAT, KM_PER_DEGREE_LAT * np.cos(np.deg2rad(line[:, 0].mean()))])
+        points = _ATTRACTION_COORDS[candidates] * scale
+        line = line * scale
+        if len(line) == 1:
+            distances = np.linalg.norm(points - line[0], axis=1)
+        else:
+            starts, ends = line[:-1], line[1:]
+            segments = ends - starts
+            lengths = np.maximum((segments ** 2).sum(axis=1), 1e-12)
+            offsets = points[:, None, :] - starts[None, :, :]
+            t = np.clip((offsets * segments).sum(axis=2) / lengths, 0.0, 1.0)
+            nearest = starts[None, :, :] + t[:, :, None] * segments[None, :, :]
+            distances = np.linalg.norm(points[:, None, :] - nearest, axis=2).min(axis=1)
         
-        return route_attractions[:5]  # Return top 5 attractions
+        return [dict(_ALL_ATTRACTIONS[i]) for i in candidates[distances <= radius_km]]
     
     def get_route_polyline(self, origin: str, destination: str) -> List[Tuple[float, float]]:
         """دریافت مسیر به صورت polyline از OpenStreetMap"""
+        with self._polyline_lock:
+            cached = self._polyline_cache.get((origin, destination))
+        if cached is not None:
+            return list(cached)
+        
         try:
             # Get coordinates
             origin_coords = self.geocode_city(origin)
@@ -270,13 +522,19 @@ class MapService:
             # Use OSRM for routing (if available)
             url = f"http://router.project-osrm.org/route/v1/driving/{origin_coords[1]},{origin_coords[0]};{dest_coords[1]},{dest_coords[0]}?overview=full&geometries=geojson"
             
-            response = requests.get(url, timeout=10)
+            response = self._http.get(url, timeout=10)
             if response.status_code == 200:
-                data = response.json()
+                data = _json_loads(response.content)
                 if data['routes']:
                     coordinates = data['routes'][0]['geometry']['coordinates']
                     # Convert from [lng, lat] to [lat, lng]
-                    return [(coord[1], coord[0]) for coord in coordinates]
+                    polyline = tuple((coord[1], coord[0]) for coord in coordinates)
+                    with self._polyline_lock:
+                        if len(self._polyline_cache) >= POLYLINE_CACHE_SIZE:
+                            # Drop the oldest entry
+                            self._polyline_cache.pop(next(iter(self._polyline_cache)), None)
+                        self._polyline_cache[(origin, destination)] = polyline
+                    return list(polyline)
             
             # Fallback to straight line
             return [origin_coords, dest_coords]
@@ -302,14 +560,12 @@ class MapService:
             out skel qt;
             """
             
-            url = "https://overpass-api.de/api/interpreter"
-            response = requests.post(url, data=query, timeout=10)
+            elements = self._overpass_elements(query)
             
-            if response.status_code == 200:
-                data = response.json()
+            if elements is not None:
                 places = []
                 
-                for element in data.get('elements', []):
+                for element in elements:
                     if element['type'] == 'node' and 'tags' in element:
                         tags = element['tags']
                         if place_type is None or tags.get('amenity') == place_type:
@@ -327,28 +583,55 @@ class MapService:
         
         return []
     
-    def calculate_route_distance(self, route_coords: List[Tuple[float, float]]) -> float:
+    async def find_nearby_places_async(self, lat: float, lng: float, radius: float = 5000,
+                                       place_type: str = None) -> List[Dict]:
+        """نسخه async یافتن مکان‌های نزدیک (بدون مسدود کردن event loop)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.find_nearby_places, lat, lng, radius, place_type)
+    
+    def _overpass_elements(self, query: str) -> Optional[List[Dict]]:
+        """اجرای کوئری Overpass با کش کوتاه‌مدت بر اساس متن کوئری"""
+        now = time.monotonic()
+        with self._overpass_lock:
+            entry = self._overpass_cache.get(query)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        
+        response = self._http.post(settings.overpass_url, data=query, timeout=10)
+        if response.status_code != 200:
+            return None
+        
+        elements = _json_loads(response.content).get('elements', [])
+        with self._overpass_lock:
+            self._overpass_cache.pop(query, None)
+            self._overpass_cache[query] = (now + OVERPASS_CACHE_TTL, elements)
+            if len(self._overpass_cache) > OVERPASS_CACHE_SIZE:
+                # Drop the oldest entry
+                self._overpass_cache.pop(next(iter(self._overpass_cache)))
+        return elements
+    
+    def calculate_route_distance(self, route_coords: List[Tuple[float, float]], accurate: bool = False) -> float:
         """محاسبه فاصله کل مسیر"""
-        total_distance = 0.0
+        if len(route_coords) < 2:
+            return 0.0
+        
+        if not accurate:
+            return float(_haversine_km(route_coords).sum())
         
-        for i in range(len(route_coords) - 1):
-            distance = geodesic(route_coords[i], route_coords[i + 1]).kilometers
-            total_distance += distance
+        # Ellipsoidal (WGS84) distance
+        if _GEOD is not None:
+            points = np.asarray(route_coords, dtype=np.float64)
+            _, _, meters = _GEOD.inv(points[:-1, 1], points[:-1, 0], points[1:, 1], points[1:, 0])
+            return float(np.sum(meters)) / 1000.0
         
-        return total_distance
+        return sum(
+            geodesic(route_coords[i], route_coords[i + 1]).kilometers
+            for i in range(len(route_coords) - 1)
+        )
     
     def estimate_travel_time(self, distance: float, transport_type: str = 'car') -> float:
         """تخمین زمان سفر"""
-        speeds = {
-            'car': 80,  # km/h
-            'train': 120,
-            'bus': 60,
-            'bicycle': 20,
-            'walking': 5
-        }
-        
-        speed = speeds.get(transport_type, 80)
-        return distance / speed  # hours
+        return distance / _SPEEDS_KMH.get(transport_type, 80)  # hours
     
     def get_weather_info(self, lat: float, lng: float) -> Optional[Dict]:
         """دریافت اطلاعات آب و هوا (نمونه)"""
@@ -394,21 +677,18 @@ class MapService:
             out skel qt;
             """
             
-            url = "https://overpass-api.de/api/interpreter"
-            response = requests.post(url, data=query, timeout=10)
+            elements = self._overpass_elements(query)
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('elements'):
-                    element = data['elements'][0]
-                    return {
-                        'name': city_name,
-                        'lat': coords[0],
-                        'lng': coords[1],
-                        'population': element.get('tags', {}).get('population'),
-                        'timezone': element.get('tags', {}).get('timezone'),
-                        'country': element.get('tags', {}).get('country')
-                    }
+            if elements:
+                element = elements[0]
+                return {
+                    'name': city_name,
+                    'lat': coords[0],
+                    'lng': coords[1],
+                    'population': element.get('tags', {}).get('population'),
+                    'timezone': element.get('tags', {}).get('timezone'),
+                    'country': element.get('tags', {}).get('country')
+                }
         
         except Exception as e:
             print(f"Error getting city info: {e}")
@@ -419,6 +699,11 @@ class MapService:
             'lng': coords[1]
         }
     
+    async def get_city_info_async(self, city_name: str) -> Optional[Dict]:
+        """نسخه async دریافت اطلاعات شهر"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_city_info, city_name)
+    
     def validate_coordinates(self, lat: float, lng: float) -> bool:
         """اعتبارسنجی مختصات جغرافیایی"""
         return -90 <= lat <= 90 and -180 <= lng <= 180
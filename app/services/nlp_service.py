@@ -1,37 +1,45 @@
 import re
+import functools
 import spacy
-import nltk
-from typing import Dict, List, Tuple, Optional
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+from typing import Dict, List, Tuple, Optional, FrozenSet
 from app.core.config import settings
 
+# translate() table that deletes Arabic-script characters (U+0600..U+06FF)
+_PERSIAN_DELETE = dict.fromkeys(range(0x0600, 0x0700))
+
+# Persian stop words
+_PERSIAN_STOP_WORDS = frozenset({
+    'و', 'در', 'به', 'از', 'که', 'این', 'آن', 'با', 'برای', 'تا', 'را', 'است', 'بود', 'شد',
+    'می', 'های', 'ها', 'ای', 'ی'
+})
+
+# Whitespace runs and punctuation (except '-') both become a single space
+_NORMALIZE_RE = re.compile(r'\s+|[^\w\s\-]')
+
+# Simple translation mapping for common words
+_TRANSLATIONS = {
+    'مسیر': 'route',
+    'سفر': 'travel',
+    'از': 'from',
+    'به': 'to',
+    'بین': 'between',
+    'بودجه': 'budget',
+    'هزینه': 'cost',
+    'زمان': 'time',
+    'جاذبه': 'attraction',
+    'ترجیح': 'preference'
+}
+
+# Single-pass scanner over all translation keys, longest key first so the
+# leftmost match is also the longest one
+_TRANSLATION_RE = re.compile(
+    '|'.join(re.escape(word) for word in sorted(_TRANSLATIONS, key=len, reverse=True))
+)
+
 class NLPService:
     def __init__(self):
-        try:
-            self.nlp = spacy.load(settings.spacy_model)
-        except OSError:
-            # Fallback to basic processing if spaCy model not available
-            self.nlp = None
-        
-        # Download NLTK data if not available
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-        
-        self.stop_words = set(stopwords.words('english'))
-        
         # Persian stop words
-        self.persian_stop_words = {
-            'و', 'در', 'به', 'از', 'که', 'این', 'آن', 'با', 'برای', 'تا', 'را', 'است', 'بود', 'شد',
-            'می', 'های', 'های', 'ها', 'ای', 'ی', 'ی', 'ی', 'ی', 'ی', 'ی', 'ی', 'ی', 'ی', 'ی'
-        }
+        self.persian_stop_words = _PERSIAN_STOP_WORDS
         
         # Intent patterns
         self.intent_patterns = {
@@ -109,6 +117,48 @@ class NLPService:
                 r'day|hour|minute|week'
             ]
         }
+        
+        # Compile patterns once instead of on every message. A trailing '.*'
+        # never changes whether search() matches, so it is dropped.
+        self.intent_regexes = {
+            intent: [re.compile(pattern.removesuffix('.*'), re.IGNORECASE) for pattern in patterns]
+            for intent, patterns in self.intent_patterns.items()
+        }
+        # Union of every intent pattern: one scan rejects messages that match
+        # no intent at all before any per-pattern scoring
+        self.intent_regex = re.compile(
+            '|'.join(f'(?:{regex.pattern})' for regexes in self.intent_regexes.values() for regex in regexes),
+            re.IGNORECASE
+        )
+        
+        # All entity patterns fused into one named-group alternation, so the
+        # text is scanned once. Numbers go last so that e.g. 'هفته' is read as
+        # a time unit rather than the number 'هفت'.
+        entity_order = sorted(self.entity_patterns, key=lambda entity_type: entity_type == 'number')
+        self.entity_regex = re.compile(
+            '|'.join(
+                f"(?P<{entity_type}>{'|'.join(self.entity_patterns[entity_type])})"
+                for entity_type in entity_order
+            ),
+            re.IGNORECASE
+        )
+        
+        # Intent/entity analysis per normalized message (chat traffic repeats a lot)
+        self._analysis_cache = functools.lru_cache(maxsize=4096)(self._analyze)
+    
+    # The spaCy model and English stop words are loaded on first use only
+    @functools.cached_property
+    def nlp(self):
+        try:
+            return spacy.load(settings.spacy_model)
+        except OSError:
+            # Fallback to basic processing if spaCy model not available
+            return None
+    
+    @functools.cached_property
+    def stop_words(self) -> FrozenSet[str]:
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        return ENGLISH_STOP_WORDS
     
     def process_message(self, message: str) -> Dict[str, any]:
         """پردازش پیام و استخراج قصد و موجودیت‌ها"""
@@ -116,11 +166,9 @@ class NLPService:
         # Normalize message
         normalized_message = self._normalize_text(message)
         
-        # Extract intent
-        intent = self._extract_intent(normalized_message)
-        
-        # Extract entities
-        entities = self._extract_entities(normalized_message)
+        # Extract intent and entities
+        intent, entity_items = self._analysis_cache(normalized_message)
+        entities = {entity_type: list(values) for entity_type, values in entity_items}
         
         # Generate response
         response = self._generate_response(intent, entities, message)
@@ -132,28 +180,30 @@ class NLPService:
             'confidence': self._calculate_confidence(intent, entities)
         }
     
+    def _analyze(self, text: str) -> Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...]]:
+        """قصد و موجودیت‌های یک متن نرمال‌شده، به شکل تغییرناپذیر برای کش"""
+        intent = self._extract_intent(text)
+        entities = self._extract_entities(text)
+        return intent, tuple((entity_type, tuple(values)) for entity_type, values in entities.items())
+    
     def _normalize_text(self, text: str) -> str:
         """نرمال‌سازی متن"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Remove punctuation (keep some for patterns)
-        text = re.sub(r'[^\w\s\-]', ' ', text)
-        
-        return text
+        # Lowercase, then collapse whitespace and remove punctuation (keep
+        # '-' for patterns) in a single pass
+        return _NORMALIZE_RE.sub(' ', text.lower().strip())
     
     def _extract_intent(self, text: str) -> str:
         """استخراج قصد از متن"""
         max_score = 0
         best_intent = 'unknown'
         
-        for intent, patterns in self.intent_patterns.items():
+        if not self.intent_regex.search(text):
+            return best_intent
+        
+        for intent, regexes in self.intent_regexes.items():
             score = 0
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
+            for regex in regexes:
+                if regex.search(text):
                     score += 1
             
             if score > max_score:
@@ -164,16 +214,14 @@ class NLPService:
     
     def _extract_entities(self, text: str) -> Dict[str, List[str]]:
         """استخراج موجودیت‌ها از متن"""
-        entities = {}
+        entities = {entity_type: [] for entity_type in self.entity_patterns}
         
-        for entity_type, patterns in self.entity_patterns.items():
-            entities[entity_type] = []
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                entities[entity_type].extend(matches)
-            
-            # Remove duplicates
-            entities[entity_type] = list(set(entities[entity_type]))
+        for match in self.entity_regex.finditer(text):
+            entities[match.lastgroup].append(match.group())
+        
+        # Remove duplicates, keeping the order of appearance
+        for entity_type, values in entities.items():
+            entities[entity_type] = list(dict.fromkeys(values))
         
         return entities
     
@@ -283,26 +331,9 @@ class NLPService:
     
     def is_persian(self, text: str) -> bool:
         """تشخیص زبان فارسی"""
-        persian_chars = re.findall(r'[\u0600-\u06FF]', text)
-        return len(persian_chars) > len(text) * 0.3
+        persian_count = len(text) - len(text.translate(_PERSIAN_DELETE))
+        return persian_count > len(text) * 0.3
     
     def translate_to_english(self, text: str) -> str:
         """ترجمه ساده فارسی به انگلیسی (برای پردازش)"""
-        # Simple translation mapping for common words
-        translations = {
-            'مسیر': 'route',
-            'سفر': 'travel',
-            'از': 'from',
-            'به': 'to',
-            'بین': 'between',
-            'بودجه': 'budget',
-            'هزینه': 'cost',
-            'زمان': 'time',
-            'جاذبه': 'attraction',
-            'ترجیح': 'preference'
-        }
-        
-        for persian, english in translations.items():
-            text = text.replace(persian, english)
-        
-        return text 
\ No newline at end of file
+        return _TRANSLATION_RE.sub(lambda match: _TRANSLATIONS[match.group()], text) 
\ No newline at end of file
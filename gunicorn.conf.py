@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for AI Travel Recommender Agent
+تنظیمات Gunicorn برای سیستم هوشمند پیشنهاد مسیر سفر
+
+Usage: gunicorn -c gunicorn.conf.py main_production:app
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import production_config
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """UvicornWorker carrying the uvicorn options gunicorn has no setting for"""
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "access_log": production_config.ACCESS_LOG,
+        "proxy_headers": False,
+        "server_header": False,
+        "date_header": False,
+        "limit_concurrency": production_config.LIMIT_CONCURRENCY,
+    }
+
+bind = f"{production_config.HOST}:{production_config.PORT}"
+workers = production_config.WORKERS
+worker_class = ProductionUvicornWorker
+
+# Import the app once in the master so workers share modules, compiled
+# templates and bytecode copy-on-write instead of re-importing everything
+preload_app = True
+
+loglevel = production_config.LOG_LEVEL.lower()
+accesslog = "-" if production_config.ACCESS_LOG else None
+
+timeout = production_config.REQUEST_TIMEOUT
+keepalive = production_config.KEEP_ALIVE_TIMEOUT
+backlog = production_config.BACKLOG
+# Recycle workers periodically, staggered so they don't all restart at once
+max_requests = production_config.MAX_REQUESTS_PER_WORKER
+max_requests_jitter = production_config.MAX_REQUESTS_PER_WORKER // 10
+
+
+def pre_fork(server, worker):
+    # Write out everything the master has queued or buffered, otherwise each
+    # child inherits a copy and writes it again
+    import main_production
+    main_production.drain_logs()
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork: restart the log listener and flusher per worker
+    import main_production
+    main_production.file_handler.start_flusher()
+    main_production.log_listener.start()
@@ -9,6 +9,7 @@ from app.core.config import settings
 from app.database import engine, Base
 from app.api.routes import router as api_router
 from app.api.chat import router as chat_router
+from app.services.map_service import MapService
 
 Base.metadata.create_all(bind=engine)
 
@@ -32,6 +33,11 @@ templates = Jinja2Templates(directory="templates")
 app.include_router(api_router, prefix="/api")
 app.include_router(chat_router, prefix="/chat")
 
+@app.on_event("startup")
+async def _bootstrap():
+    # One shared instance per worker, handed to routes via Depends
+    app.state.map_service = MapService()
+
 @app.get("/")
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
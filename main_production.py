@@ -6,14 +6,24 @@ AI Travel Recommender Agent - Production Server
 
 import os
 import sys
+import json
+import atexit
+import queue
 import logging
+import re
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.routing import APIRoute
+from starlette.routing import Match
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, HTMLResponse, Response, FileResponse
+from jinja2 import FileSystemBytecodeCache
 import uvicorn
 
 # Add project root to Python path
@@ -32,103 +42,293 @@ except ImportError:
     SECRET_KEY = "dev-secret-key"
     ALLOWED_HOSTS = ["*"]
     DEFAULT_LANGUAGE = "en"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+    ACCESS_LOG = os.getenv("ACCESS_LOG", "0") == "1"
+    ENVIRONMENT = "production"
+    WORKERS = 1
+    LOG_FILE = "app.log"
+    STATIC_DIR = project_root / "app" / "static"
+    TEMPLATES_DIR = project_root / "templates"
+    JINJA_CACHE_DIR = project_root / ".jinja_cache"
+    STATIC_CACHE_CONTROL = "no-cache"
+    STATIC_HASHED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+    JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    REQUEST_TIMEOUT = 30
+    KEEP_ALIVE_TIMEOUT = 10
+    LIMIT_CONCURRENCY = 1000
+    MAX_REQUESTS_PER_WORKER = 10000
+    BACKLOG = 2048
 
 # Import application modules
 from app.core.config import settings
 from app.database import engine, Base
 from app.api.routes import router as api_router
 from app.api.chat import router as chat_router
+from app.services.map_service import MapService
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL if 'LOG_LEVEL' in locals() else 'INFO'),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE if 'LOG_FILE' in locals() else 'app.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+class BufferedFileHandler(logging.Handler):
+    """File handler that batches records in memory; the buffer is written when
+    full or every flush_interval seconds instead of once per record"""
+
+    def __init__(self, filename, buffer_size=64 * 1024, flush_interval=0.5):
+        super().__init__()
+        self.stream = open(filename, 'ab', buffering=buffer_size)
+        self.flush_interval = flush_interval
+        self._closed = threading.Event()
+        self.start_flusher()
+
+    def start_flusher(self):
+        """Start the periodic flush thread (again, in a freshly forked worker)"""
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            args=(self.flush_interval,),
+            name="log-flusher",
+            daemon=True
+        )
+        self._flusher.start()
+
+    def _flush_periodically(self, interval):
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record).encode('utf-8') + b'\n')
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if not self.stream.closed:
+                self.stream.flush()
+
+    def close(self):
+        self._closed.set()
+        with self.lock:
+            if not self.stream.closed:
+                self.stream.flush()
+                self.stream.close()
+        super().close()
+
+# Configure logging: callers only enqueue records, a listener thread owns
+# the file and stdout handlers so slow disks never block the event loop
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+file_handler = BufferedFileHandler(LOG_FILE)
+stream_handler = logging.StreamHandler(sys.stdout)
+for handler in (file_handler, stream_handler):
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+root_logger = logging.getLogger()
+root_logger.setLevel(getattr(logging, LOG_LEVEL))
+root_logger.addHandler(QueueHandler(log_queue))
+
+log_listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+def drain_logs():
+    """Write every queued and buffered log record to its handlers"""
+    log_listener.stop()
+    file_handler.flush()
+    log_listener.start()
 
 logger = logging.getLogger(__name__)
 
-# Create database tables
+# Create database tables (idempotent; with gunicorn's preload_app this runs
+# once in the master rather than in every worker)
 try:
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created successfully")
 except Exception as e:
-    logger.error(f"Error creating database tables: {e}")
+    logger.error("Error creating database tables: %s", e)
 
 # Create FastAPI application
 app = FastAPI(
     title="AI Travel Recommender Agent",
     description="سیستم هوشمند پیشنهاد مسیر سفر",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if not PRODUCTION else None,
     redoc_url="/redoc" if not PRODUCTION else None
 )
 
-# Security middleware
-if PRODUCTION and ALLOWED_HOSTS != ["*"]:
+# Security middleware (a "*" entry would make it a pass-through layer)
+if PRODUCTION and "*" not in ALLOWED_HOSTS:
     app.add_middleware(
         TrustedHostMiddleware,
         allowed_hosts=ALLOWED_HOSTS
     )
 
+class WildcardCORSMiddleware:
+    """Allow-all CORS with fixed headers: preflights are answered directly and
+    requests without an Origin header pass straight through"""
+
+    PREFLIGHT_HEADERS = [
+        (b"access-control-allow-origin", b"*"),
+        (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+        (b"access-control-max-age", b"600"),
+        (b"vary", b"Origin"),
+        (b"content-length", b"0"),
+    ]
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        requested_method = None
+        requested_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                requested_method = value
+            elif name == b"access-control-request-headers":
+                requested_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and requested_method is not None:
+            headers = list(self.PREFLIGHT_HEADERS)
+            if requested_headers is not None:
+                headers.append((b"access-control-allow-headers", requested_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"access-control-allow-origin", b"*")]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
 # CORS middleware
+cors_origins = ["*"] if not PRODUCTION else ALLOWED_HOSTS
+if "*" in cors_origins:
+    app.add_middleware(WildcardCORSMiddleware)
+else:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+class StaticCacheControlMiddleware:
+    """ASGI middleware that sets Cache-Control on /static responses: long-lived
+    for content-hashed file names, revalidated for everything else"""
+
+    HASHED_NAME_RE = re.compile(r"[.-][0-9a-fA-F]{8,}(\.[A-Za-z0-9]+)+$")
+
+    def __init__(self, app, cache_control, hashed_cache_control):
+        self.app = app
+        self.cache_control = cache_control.encode("latin-1")
+        self.hashed_cache_control = hashed_cache_control.encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/static/"):
+            await self.app(scope, receive, send)
+            return
+
+        if self.HASHED_NAME_RE.search(scope["path"]):
+            cache_control = self.hashed_cache_control
+        else:
+            cache_control = self.cache_control
+
+        async def send_with_cache_control(message):
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                headers = [(name, value) for name, value in message.get("headers", []) if name != b"cache-control"]
+                headers.append((b"cache-control", cache_control))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
+
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"] if not PRODUCTION else ALLOWED_HOSTS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    StaticCacheControlMiddleware,
+    cache_control=STATIC_CACHE_CONTROL,
+    hashed_cache_control=STATIC_HASHED_CACHE_CONTROL
 )
 
+# Compression (outermost, so it sees the final headers and body)
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
+class BulkStaticFiles(StaticFiles):
+    """StaticFiles reading assets in 1 MiB chunks, so a typical JS/CSS bundle
+    goes out in one read/send instead of one per 64 KiB"""
+
+    chunk_size = 1024 * 1024
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        if isinstance(response, FileResponse):
+            response.chunk_size = self.chunk_size
+        return response
+
 # Mount static files
 try:
-    static_dir = STATIC_DIR if 'STATIC_DIR' in locals() else project_root / "app" / "static"
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-    logger.info(f"Static files mounted from: {static_dir}")
+    app.mount("/static", BulkStaticFiles(directory=str(STATIC_DIR)), name="static")
+    logger.info("Static files mounted from: %s", STATIC_DIR)
 except Exception as e:
-    logger.warning(f"Could not mount static files: {e}")
+    logger.warning("Could not mount static files: %s", e)
 
 # Templates
 try:
-    templates_dir = TEMPLATES_DIR if 'TEMPLATES_DIR' in locals() else project_root / "templates"
-    templates = Jinja2Templates(directory=str(templates_dir))
-    logger.info(f"Templates loaded from: {templates_dir}")
+    templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+    # Reuse compiled template bytecode across workers and restarts
+    templates.env.bytecode_cache = FileSystemBytecodeCache(
+        directory=str(JINJA_CACHE_DIR),
+        pattern="__jcache_%s.cache"
+    )
+    templates.env.auto_reload = not PRODUCTION
+    logger.info("Templates loaded from: %s", TEMPLATES_DIR)
 except Exception as e:
-    logger.error(f"Could not load templates: {e}")
+    logger.error("Could not load templates: %s", e)
     templates = None
 
 # Include routers
 app.include_router(api_router, prefix="/api")
 app.include_router(chat_router, prefix="/chat")
 
+# Health and metrics payloads are constant, so serialize them once
+HEALTH_BYTES = json.dumps({
+    "status": "healthy",
+    "version": "1.0.0",
+    "environment": ENVIRONMENT
+}).encode("utf-8")
+
+METRICS_BYTES = json.dumps({
+    "uptime": "running",
+    "requests": 0,
+    "errors": 0
+}).encode("utf-8")
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
-    return {
-        "status": "healthy",
-        "version": "1.0.0",
-        "environment": ENVIRONMENT if 'ENVIRONMENT' in locals() else "production"
-    }
+    return Response(content=HEALTH_BYTES, media_type="application/json")
 
 # Metrics endpoint
 @app.get("/metrics")
 async def metrics():
     """Basic metrics endpoint"""
-    return {
-        "uptime": "running",
-        "requests": 0,
-        "errors": 0
-    }
+    return Response(content=METRICS_BYTES, media_type="application/json")
 
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: HTTPException):
     """Handle 404 errors"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content={"error": "صفحه مورد نظر یافت نشد", "path": str(request.url.path)}
     )
@@ -136,63 +336,116 @@ async def not_found_handler(request: Request, exc: HTTPException):
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc: HTTPException):
     """Handle 500 errors"""
-    logger.error(f"Internal server error: {exc}")
-    return JSONResponse(
+    logger.error("Internal server error: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content={"error": "خطای داخلی سرور", "message": "لطفاً بعداً تلاش کنید"}
     )
 
-# Main page routes
-@app.get("/")
-async def home(request: Request):
-    """صفحه اصلی"""
-    if not templates:
-        return JSONResponse(content={"error": "Templates not available"})
-    
-    try:
-        return templates.TemplateResponse("index.html", {"request": request})
-    except Exception as e:
-        logger.error(f"Error rendering home page: {e}")
-        return JSONResponse(content={"error": "خطا در بارگذاری صفحه اصلی"})
-
-@app.get("/map")
-async def map_view(request: Request):
-    """صفحه نقشه"""
-    if not templates:
-        return JSONResponse(content={"error": "Templates not available"})
-    
-    try:
-        return templates.TemplateResponse("map.html", {"request": request})
-    except Exception as e:
-        logger.error(f"Error rendering map page: {e}")
-        return JSONResponse(content={"error": "خطا در بارگذاری صفحه نقشه"})
-
-@app.get("/chat")
-async def chat_view(request: Request):
-    """صفحه چت"""
+# Main page routes: path -> (template, error message)
+# The page templates use no request data, so each one is rendered once at startup
+PAGES = {
+    "/": ("index.html", "خطا در بارگذاری صفحه اصلی"),
+    "/map": ("map.html", "خطا در بارگذاری صفحه نقشه"),
+    "/chat": ("chat.html", "خطا در بارگذاری صفحه چت")
+}
+
+def render_static_pages():
+    """رندر یک‌باره صفحات ثابت به بایت"""
+    pages = {}
     if not templates:
-        return JSONResponse(content={"error": "Templates not available"})
+        logger.error("Templates not available")
+        return pages
     
-    try:
-        return templates.TemplateResponse("chat.html", {"request": request})
-    except Exception as e:
-        logger.error(f"Error rendering chat page: {e}")
-        return JSONResponse(content={"error": "خطا در بارگذاری صفحه چت"})
+    for path, (template_name, _) in PAGES.items():
+        try:
+            pages[path] = templates.get_template(template_name).render({"request": None}).encode("utf-8")
+        except Exception as e:
+            logger.error("Error rendering %s: %s", template_name, e)
+    return pages
+
+def make_page_handler(path, error_message):
+    """هندلر صفحه‌ای که بایت‌های از پیش رندرشده را برمی‌گرداند"""
+    async def page():
+        content = app.state.cached_pages.get(path)
+        if content is None:
+            return ORJSONResponse(content={"error": error_message})
+        return HTMLResponse(content=content)
+    return page
+
+for page_path, (page_template, page_error) in PAGES.items():
+    app.add_api_route(
+        page_path,
+        make_page_handler(page_path, page_error),
+        methods=["GET"],
+        name=page_template.removesuffix(".html")
+    )
+
+class ExactRouteDispatcher:
+    """Router entry point that resolves parameter-free routes with a dict
+    lookup on (method, path) and falls back to Starlette's linear regex walk"""
+
+    def __init__(self, router):
+        self.router = router
+        self.fallback = router.app
+        self.routes = {}
+        earlier = []
+        for route in router.routes:
+            # Skip paths an earlier route could claim, so match order is unchanged
+            if (
+                isinstance(route, APIRoute)
+                and not route.param_convertors
+                and not any(
+                    prev.path != route.path and prev.path_regex.match(route.path)
+                    for prev in earlier
+                )
+            ):
+                for method in route.methods:
+                    self.routes.setdefault((method, route.path), route)
+            if hasattr(route, "path_regex"):
+                earlier.append(route)
+
+    async def __call__(self, scope, receive, send):
+        route = None
+        if scope["type"] == "http" and not scope.get("root_path"):
+            route = self.routes.get((scope["method"], scope["path"]))
+        if route is None:
+            await self.fallback(scope, receive, send)
+            return
+
+        if "router" not in scope:
+            scope["router"] = self.router
+        match, child_scope = route.matches(scope)
+        if match != Match.FULL:
+            await self.fallback(scope, receive, send)
+            return
+        scope.update(child_scope)
+        await route.handle(scope, receive, send)
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Application startup event"""
     logger.info("🚀 AI Travel Recommender Agent starting up...")
-    logger.info(f"Environment: {ENVIRONMENT if 'ENVIRONMENT' in locals() else 'production'}")
-    logger.info(f"Debug mode: {DEBUG if 'DEBUG' in locals() else False}")
-    logger.info(f"Production mode: {PRODUCTION if 'PRODUCTION' in locals() else False}")
+    # One shared instance per worker, handed to routes via Depends
+    app.state.map_service = MapService()
+    app.state.cached_pages = render_static_pages()
+    # All routes are registered by now
+    app.router.middleware_stack = ExactRouteDispatcher(app.router)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Environment: %s", ENVIRONMENT)
+        logger.info("Debug mode: %s", DEBUG)
+        logger.info("Production mode: %s", PRODUCTION)
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     logger.info("🛑 AI Travel Recommender Agent shutting down...")
+    # Drain pending records; stop() is not safe to call twice
+    atexit.unregister(log_listener.stop)
+    log_listener.stop()
+    file_handler.flush()
 
 if __name__ == "__main__":
     # Production server configuration
@@ -200,8 +453,19 @@ if __name__ == "__main__":
         "main_production:app",
         host=HOST,
         port=PORT,
-        workers=WORKERS if 'WORKERS' in locals() else 1,
-        log_level=LOG_LEVEL.lower() if 'LOG_LEVEL' in locals() else "info",
-        access_log=True,
-        reload=DEBUG if 'DEBUG' in locals() else False
+        workers=WORKERS,
+        log_level=LOG_LEVEL.lower(),
+        access_log=ACCESS_LOG,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        limit_concurrency=LIMIT_CONCURRENCY,
+        limit_max_requests=MAX_REQUESTS_PER_WORKER,
+        backlog=BACKLOG,
+        # The app never reads client addresses, so skip the proxy-header
+        # middleware and the per-response Server/Date headers
+        proxy_headers=False,
+        server_header=False,
+        date_header=False,
+        reload=DEBUG
     ) 
\ No newline at end of file
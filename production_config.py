@@ -17,7 +17,8 @@ DEBUG = False
 # Server settings
 HOST = "0.0.0.0"
 PORT = 8000
-WORKERS = 4
+# 2 * cores + 1 by default; WEB_CONCURRENCY overrides it
+WORKERS = int(os.getenv("WEB_CONCURRENCY", max(2, (os.cpu_count() or 1) * 2 + 1)))
 
 # Database settings
 DATABASE_URL = "sqlite:///./ai_travel_agent.db"
@@ -33,6 +34,11 @@ LOG_FILE = BASE_DIR / "logs" / "app.log"
 # Static files
 STATIC_DIR = BASE_DIR / "app" / "static"
 TEMPLATES_DIR = BASE_DIR / "templates"
+JINJA_CACHE_DIR = BASE_DIR / ".jinja_cache"
+# Plain asset names can change content on deploy, so they are revalidated (ETag);
+# names carrying a content hash (app.3f2a9c1b.js) are cached for a year
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "no-cache")
+STATIC_HASHED_CACHE_CONTROL = os.getenv("STATIC_HASHED_CACHE_CONTROL", "public, max-age=31536000, immutable")
 
 # API settings
 API_PREFIX = "/api"
@@ -89,6 +95,13 @@ TRANSLATION_API_KEY = os.getenv("TRANSLATION_API_KEY", "")
 CONNECTION_POOL_SIZE = 20
 MAX_CONNECTIONS = 100
 REQUEST_TIMEOUT = 30
+# Slightly above the reverse proxy's idle upstream timeout, so the proxy closes first
+KEEP_ALIVE_TIMEOUT = 10
+# Per worker; uvicorn counts idle keep-alive connections too, so leave room
+# for MAX_CONNECTIONS open clients on top of in-flight requests
+LIMIT_CONCURRENCY = MAX_CONNECTIONS * 10
+MAX_REQUESTS_PER_WORKER = 10000  # recycle workers before memory fragmentation builds up
+BACKLOG = 2048
 
 # Backup settings
 BACKUP_ENABLED = True
@@ -119,6 +132,11 @@ elif ENVIRONMENT == "production":
     DEBUG = False
     LOG_LEVEL = "WARNING"
 
+# Explicit overrides win over the environment defaults above
+LOG_LEVEL = os.getenv("LOG_LEVEL", LOG_LEVEL).upper()
+# Per-request access log lines are written on the event loop; off unless asked for
+ACCESS_LOG = os.getenv("ACCESS_LOG", "0") == "1"
+
 # Create necessary directories
 def create_directories():
     """Create necessary directories for the application"""
@@ -128,20 +146,24 @@ def create_directories():
         BASE_DIR / "uploads",
         BASE_DIR / "backups",
         STATIC_DIR,
-        TEMPLATES_DIR
+        TEMPLATES_DIR,
+        JINJA_CACHE_DIR
     ]
     
     for directory in directories:
         directory.mkdir(parents=True, exist_ok=True)
 
-# Initialize directories
-create_directories()
+# Initialize directories once; worker processes inherit the flag
+if os.environ.get("TRAVEL_AGENT_DIRS_READY") != "1":
+    create_directories()
+    os.environ["TRAVEL_AGENT_DIRS_READY"] = "1"
 
 # Export settings
 __all__ = [
     "PRODUCTION", "DEBUG", "HOST", "PORT", "WORKERS",
     "DATABASE_URL", "SECRET_KEY", "ALLOWED_HOSTS",
-    "LOG_LEVEL", "LOG_FILE", "STATIC_DIR", "TEMPLATES_DIR",
+    "LOG_LEVEL", "LOG_FILE", "STATIC_DIR", "TEMPLATES_DIR", "JINJA_CACHE_DIR",
+    "STATIC_CACHE_CONTROL", "STATIC_HASHED_CACHE_CONTROL",
     "API_PREFIX", "API_VERSION", "MAP_CENTER", "MAP_ZOOM",
     "CHAT_HISTORY_LIMIT", "MAX_MESSAGE_LENGTH",
     "DEFAULT_FUEL_COST_PER_KM", "AVERAGE_SPEED_KMH",
@@ -151,6 +173,7 @@ __all__ = [
     "METRICS_ENDPOINT", "MAX_FILE_SIZE", "ALLOWED_FILE_TYPES",
     "RATE_LIMIT_REQUESTS", "RATE_LIMIT_WINDOW",
     "CONNECTION_POOL_SIZE", "MAX_CONNECTIONS", "REQUEST_TIMEOUT",
+    "KEEP_ALIVE_TIMEOUT", "LIMIT_CONCURRENCY", "MAX_REQUESTS_PER_WORKER", "BACKLOG",
     "BACKUP_ENABLED", "BACKUP_INTERVAL", "BACKUP_RETENTION_DAYS",
-    "SSL_ENABLED", "ENVIRONMENT"
+    "SSL_ENABLED", "ENVIRONMENT", "ACCESS_LOG"
 ] 
\ No newline at end of file